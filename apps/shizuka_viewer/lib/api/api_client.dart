@@ -576,18 +576,8 @@ class ApiClient {
     Map<String, dynamic> gridJson,
     List<GridContourFeature> contours,
   ) {
-    final rows = gridJson['data'] as List<dynamic>?;
-    if (rows == null || rows.isEmpty) {
-      return null;
-    }
-
-    final data = <List<double>>[];
-    for (final row in rows) {
-      if (row is List) {
-        data.add(row.map((value) => (value as num).toDouble()).toList());
-      }
-    }
-    if (data.isEmpty) {
+    final data = _decodeGridData(gridJson);
+    if (data == null || data.isEmpty) {
       return null;
     }
 
@@ -622,6 +612,45 @@ class ApiClient {
     );
   }
 
+  List<List<double>>? _decodeGridData(Map<String, dynamic> gridJson) {
+    // Current grids ship a base64 little-endian float32 buffer plus its shape
+    final encoded = gridJson['data_b64'] as String?;
+    if (encoded != null) {
+      final shape = (gridJson['shape'] as List<dynamic>?)?.cast<num>();
+      if (shape == null || shape.length < 2) {
+        return null;
+      }
+      final height = shape[0].toInt();
+      final width = shape[1].toInt();
+      final bytes = ByteData.sublistView(base64Decode(encoded));
+      if (bytes.lengthInBytes < height * width * 4) {
+        return null;
+      }
+      return List.generate(
+        height,
+        (row) => List.generate(
+          width,
+          (col) => bytes.getFloat32((row * width + col) * 4, Endian.little),
+          growable: false,
+        ),
+        growable: false,
+      );
+    }
+
+    // Older grids carry the values as nested JSON lists
+    final rows = gridJson['data'] as List<dynamic>?;
+    if (rows == null) {
+      return null;
+    }
+    final data = <List<double>>[];
+    for (final row in rows) {
+      if (row is List) {
+        data.add(row.map((value) => (value as num).toDouble()).toList());
+      }
+    }
+    return data;
+  }
+
   GridSource? _parseGridSource({
     String? gridUrl,
     String? gridPath,
@@ -78,6 +78,8 @@ EXECUTE FUNCTION set_updated_at();
 CREATE INDEX raw_measurements_sensor_ts_idx ON raw_measurements(sensor_id, ts DESC);
 CREATE INDEX raw_measurements_ts_idx ON raw_measurements(ts DESC);
 CREATE INDEX raw_measurements_source_idx ON raw_measurements(source);
+-- The cleaner only reads precipitation rows, always by time range
+CREATE INDEX raw_measurements_precip_ts_idx ON raw_measurements(ts) WHERE variable = 'precipitacion';
 
 -- Partitioning hint: For very large datasets, consider partitioning by date range
 -- Example: PARTITION BY RANGE (ts)
@@ -106,10 +108,15 @@ EXECUTE FUNCTION set_updated_at();
 
 CREATE INDEX clean_measurements_sensor_ts_idx ON clean_measurements(sensor_id, ts DESC);
 CREATE INDEX clean_measurements_ts_idx ON clean_measurements(ts DESC);
+CREATE INDEX clean_measurements_ts_sensor_idx ON clean_measurements(ts, sensor_id);
 CREATE INDEX clean_measurements_imputation_idx ON clean_measurements(imputation_method) WHERE imputation_method IS NOT NULL;
+-- Rows arrive roughly in ts order, so a BRIN index covers the archiver's
+-- day-range scans at a fraction of a btree's size
+CREATE INDEX clean_measurements_ts_brin ON clean_measurements USING BRIN (ts) WITH (pages_per_range = 32);
 
 -- Partitioning hint: For very large datasets, consider partitioning by date range
--- Example: PARTITION BY RANGE (ts)
+-- Example: PARTITION BY RANGE (ts) with one partition per day, so archiving a
+-- day becomes DETACH PARTITION + DROP TABLE instead of a row-by-row DELETE
 
 COMMENT ON TABLE clean_measurements IS 'Quality-controlled precipitation measurements with imputation';
 COMMENT ON COLUMN clean_measurements.qc_flags IS 'Quality control flags bitmap';
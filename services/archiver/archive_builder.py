@@ -1,43 +1,72 @@
 """
-Archive builder - converts measurements to JSON format for storage
+Archive builder - converts measurements to compressed JSON for storage
 """
 
 from __future__ import annotations
 
 import gzip
-import json
 import logging
-from collections import defaultdict
 from datetime import datetime
-from typing import Any
+from io import BytesIO
+from typing import Any, BinaryIO, Iterator, Union
+
+import orjson
+import zstandard
 
 logger = logging.getLogger(__name__)
 
+# File extension and content type for each supported archive codec
+ARCHIVE_FORMATS: dict[str, tuple[str, str]] = {
+    "gzip": (".json.gz", "application/json+gzip"),
+    "zstd": (".json.zst", "application/zstd"),
+    "none": (".json", "application/json"),
+}
+
 
 class ArchiveBuilder:
     """Builds JSON archives from measurement data"""
     
     def __init__(self):
         # Group measurements by day and sensor
-        self.data_by_day: dict[str, dict[str, list[dict]]] = defaultdict(lambda: defaultdict(list))
+        self.data_by_day: dict[str, dict[str, list[dict]]] = {}
+        # Rows arrive ordered by ts, so consecutive measurements share a day;
+        # remember the last one to skip re-deriving its key
+        self._last_ordinal = -1
+        self._last_day_key = ""
     
-    def add_measurement(self, measurement: dict) -> None:
+    def add_measurement(self, measurement: dict) -> str:
         """
         Add a measurement to the archive
         
         Args:
             measurement: Dict with keys: sensor_id, ts, value_mm, qc_flags, imputation_method
+            
+        Returns:
+            Day key (YYYY-MM-DD) the measurement was filed under
         """
         ts: datetime = measurement["ts"]
-        day_key = ts.strftime("%Y-%m-%d")
+        ordinal = ts.toordinal()
+        if ordinal != self._last_ordinal:
+            self._last_ordinal = ordinal
+            self._last_day_key = f"{ts.year:04d}-{ts.month:02d}-{ts.day:02d}"
+        day_key = self._last_day_key
         sensor_id = measurement["sensor_id"]
         
-        self.data_by_day[day_key][sensor_id].append({
-            "time": ts.isoformat(),
-            "measurement": float(measurement["value_mm"]),
+        sensors = self.data_by_day.get(day_key)
+        if sensors is None:
+            sensors = self.data_by_day[day_key] = {}
+        readings = sensors.get(sensor_id)
+        if readings is None:
+            readings = sensors[sensor_id] = []
+        
+        readings.append({
+            # orjson serializes datetimes as ISO 8601 natively
+            "time": ts,
+            "measurement": measurement["value_mm"],
             "qc_flags": measurement.get("qc_flags", 0),
             "imputation_method": measurement.get("imputation_method"),
         })
+        return day_key
     
     def build_archive_for_day(self, day: str) -> dict[str, Any]:
         """
@@ -51,7 +80,7 @@ class ArchiveBuilder:
         """
         sensors_data = []
         
-        for sensor_id, measurements in self.data_by_day[day].items():
+        for sensor_id, measurements in self.data_by_day.get(day, {}).items():
             sensors_data.append({
                 "sensor": sensor_id,
                 "measurements": measurements
@@ -66,20 +95,116 @@ class ArchiveBuilder:
         """Get list of all days in the archive"""
         return sorted(self.data_by_day.keys())
     
+    def drop_day(self, day: str) -> None:
+        """Release the accumulated data for a day once its archive is written"""
+        self.data_by_day.pop(day, None)
+    
     def clear(self) -> None:
         """Clear all accumulated data"""
         self.data_by_day.clear()
 
 
-def compress_archive(archive_json: dict) -> bytes:
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value)
+
+
+def _iter_json(archive_json: dict) -> Iterator[bytes]:
     """
-    Compress archive JSON with gzip
+    Encode archive JSON incrementally
+    
+    List values (the per-sensor ``data`` entries) are encoded one item at a
+    time so the full document never exists as a single string.
+    """
+    yield b"{"
+    for index, (key, value) in enumerate(archive_json.items()):
+        yield (b"," if index else b"") + _dumps(key) + b":"
+        if isinstance(value, list):
+            yield b"["
+            for item_index, item in enumerate(value):
+                yield (b"," if item_index else b"") + _dumps(item)
+            yield b"]"
+        else:
+            yield _dumps(value)
+    yield b"}"
+
+
+def stream_compress(
+    archive_json: Union[dict, bytes],
+    out: BinaryIO,
+    codec: str = "zstd",
+    level: int = 3
+) -> None:
+    """
+    Write archive JSON to ``out`` compressed, encoding and compressing in step
+    
+    Args:
+        archive_json: Archive dictionary, or an already encoded JSON document
+        out: Writable binary file object receiving the compressed stream
+        codec: Compression codec, one of ARCHIVE_FORMATS
+        level: Codec compression level (gzip 1-9, zstd 1-22)
+    """
+    if codec == "zstd":
+        # threads=-1 lets zstd compress frames on all available cores
+        compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+        stream = compressor.stream_writer(out, closefd=False)
+    elif codec == "gzip":
+        stream = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=level)
+    else:
+        raise ValueError(f"Unsupported archive codec: {codec}")
+    
+    with stream:
+        if isinstance(archive_json, bytes):
+            stream.write(archive_json)
+        else:
+            for chunk in _iter_json(archive_json):
+                stream.write(chunk)
+
+
+def compress_archive(
+    archive_json: Union[dict, bytes],
+    codec: str = "zstd",
+    level: int = 3
+) -> bytes:
+    """
+    Compress archive JSON
+    
+    Args:
+        archive_json: Archive dictionary, or an already encoded JSON document
+        codec: Compression codec, one of ARCHIVE_FORMATS
+        level: Codec compression level
+        
+    Returns:
+        Compressed JSON bytes
+    """
+    buffer = BytesIO()
+    stream_compress(archive_json, buffer, codec, level)
+    return buffer.getvalue()
+
+
+def encode_archive(
+    archive_json: Union[dict, bytes],
+    codec: str = "zstd",
+    level: int = 3,
+    min_compress_bytes: int = 0
+) -> tuple[bytes, str]:
+    """
+    Encode archive JSON for upload, leaving tiny documents uncompressed
+    
+    Compression framing costs more than it saves on documents of a few
+    hundred bytes, so those are returned as plain JSON.
     
     Args:
-        archive_json: Archive dictionary to compress
+        archive_json: Archive dictionary, or an already encoded JSON document
+        codec: Compression codec, one of ARCHIVE_FORMATS
+        level: Codec compression level
+        min_compress_bytes: Encoded size below which compression is skipped
         
     Returns:
-        Gzipped JSON bytes
+        Tuple of (payload bytes, codec actually used)
     """
-    json_str = json.dumps(archive_json, separators=(",", ":"))
-    return gzip.compress(json_str.encode("utf-8"))
+    if min_compress_bytes > 0:
+        if not isinstance(archive_json, bytes):
+            archive_json = _dumps(archive_json)
+        if len(archive_json) < min_compress_bytes:
+            return archive_json, "none"
+    return compress_archive(archive_json, codec, level), codec
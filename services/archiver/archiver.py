@@ -5,17 +5,47 @@ Main archiver service logic
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Union
 
-from .archive_builder import ArchiveBuilder, compress_archive
+from .archive_builder import ArchiveBuilder, encode_archive
 from .config import ArchiverConfig
-from .db import ArchiveDatabase
+from .db import ArchiveDatabase, MeasurementCopySink
 from .uploader import ArchiveUploader
 
 logger = logging.getLogger(__name__)
 
 
+class _DayPipeline:
+    """Runs per-day archive work on a thread pool, bounding how much is in flight"""
+    
+    def __init__(self, worker: Callable[..., Any], concurrency: int):
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._worker = worker
+        self._pending: set[Future] = set()
+        # Cap queued days so memory stays bounded when the producer outpaces
+        # the workers
+        self._max_pending = 2 * concurrency
+        self.results: list[Any] = []
+    
+    def submit(self, *args: Any) -> None:
+        """Queue one day of work, blocking while too many are in flight"""
+        self._pending.add(self._executor.submit(self._worker, *args))
+        if len(self._pending) >= self._max_pending:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            self.results.extend(future.result() for future in done)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for future in as_completed(self._pending):
+            self.results.append(future.result())
+        self._pending.clear()
+        self._executor.shutdown()
+
+
 class ArchiverService:
     """Main service for archiving old measurements"""
     
@@ -23,6 +53,7 @@ class ArchiverService:
         self.cfg = cfg
         self.db = ArchiveDatabase(cfg)
         self.uploader = ArchiveUploader(cfg)
+        self.compression_level = cfg.zstd_level if cfg.compression == "zstd" else cfg.gzip_level
     
     def run(self) -> dict[str, int]:
         """
@@ -42,103 +73,177 @@ class ArchiverService:
             "archives_created": 0,
         }
         
+        # Single tz-aware snapshot so both cutoffs agree and match TIMESTAMPTZ
+        now = datetime.now(timezone.utc)
+        raw_cutoff = now - timedelta(days=self.cfg.raw_retention_days)
+        clean_cutoff = now - timedelta(days=self.cfg.clean_retention_days)
+        
         with self.db:
             # Step 1: Delete old raw measurements
             logger.info("Step 1: Deleting old raw measurements...")
-            raw_cutoff = datetime.utcnow() - timedelta(days=self.cfg.raw_retention_days)
             stats["raw_deleted"] = self.db.delete_old_raw_measurements(raw_cutoff)
             
             # Step 2: Archive old clean measurements
             logger.info("Step 2: Archiving old clean measurements...")
-            clean_cutoff = datetime.utcnow() - timedelta(days=self.cfg.clean_retention_days)
-            
-            # Check if there's data to archive
-            count = self.db.count_measurements_to_archive(clean_cutoff)
-            if count == 0:
-                logger.info("No clean measurements to archive")
-                return stats
-            
-            logger.info(f"Found {count} clean measurements to archive")
             
-            # Get date range
+            # Get date range; (None, None) means there is nothing to archive
             min_date, max_date = self.db.get_date_range_for_archiving(clean_cutoff)
             if min_date is None:
-                logger.info("No clean measurements found in date range")
+                logger.info("No clean measurements to archive")
                 return stats
             
             logger.info(f"Archiving measurements from {min_date} to {max_date}")
             
-            # Fetch and build archives day by day
-            archive_results = self._archive_measurements(min_date, clean_cutoff)
+            # Archive day by day; archived rows are deleted as part of each day
+            archive_results = self._archive_measurements(min_date, max_date, clean_cutoff)
             stats["clean_archived"] = archive_results["archived"]
             stats["archives_created"] = archive_results["archives_created"]
-            
-            # Step 3: Delete archived measurements
-            if not self.cfg.dry_run and archive_results["archived"] > 0:
-                logger.info("Step 3: Deleting archived measurements from database...")
-                stats["clean_deleted"] = self.db.delete_archived_measurements(min_date, clean_cutoff)
+            stats["clean_deleted"] = archive_results["deleted"]
             
         return stats
     
     def _archive_measurements(
         self,
         start_date: datetime,
+        last_date: datetime,
         end_date: datetime
     ) -> dict[str, int]:
         """
-        Archive measurements in the given date range
+        Archive measurements in the given date range and delete them
         
         Args:
             start_date: Start of range (inclusive)
+            last_date: Timestamp of the newest measurement in range
             end_date: End of range (exclusive)
             
         Returns:
-            Dict with 'archived' count and 'archives_created' count
+            Dict with 'archived', 'archives_created' and 'deleted' counts
         """
+        if self.cfg.db_json:
+            return self._archive_with_db_json(start_date, last_date, end_date)
+        return self._archive_with_builder(start_date, end_date)
+    
+    def _archive_with_builder(
+        self,
+        start_date: datetime,
+        end_date: datetime
+    ) -> dict[str, int]:
+        """Archive by streaming rows with COPY and building JSON in Python"""
         builder = ArchiveBuilder()
-        total_archived = 0
-        archives_created = 0
-        offset = 0
+        current_day: Optional[str] = None
+        # (id, updated_at) keys of the current day's rows, deleted once it uploads
+        ids: list[int] = []
+        updated_ats: list[datetime] = []
         
-        while True:
-            # Fetch batch of measurements
-            measurements = self.db.fetch_clean_measurements_to_archive(
-                start_date,
-                end_date,
-                batch_size=self.cfg.batch_size,
-                offset=offset
-            )
+        with _DayPipeline(self._upload_built_day, self.cfg.upload_concurrency) as uploads:
             
-            if not measurements:
-                break
+            def submit_day(day: str) -> None:
+                nonlocal ids, updated_ats
+                archive = builder.build_archive_for_day(day)
+                builder.drop_day(day)
+                uploads.submit(day, archive, ids, updated_ats)
+                ids, updated_ats = [], []
             
-            # Add to builder
-            for measurement in measurements:
-                builder.add_measurement(measurement)
-                total_archived += 1
+            def on_row(measurement: dict) -> None:
+                # Rows arrive ordered by ts, so a new day key means the previous
+                # day is complete and can be uploaded and released from memory
+                nonlocal current_day
+                day = builder.add_measurement(measurement)
+                if day != current_day:
+                    if current_day is not None:
+                        submit_day(current_day)
+                    current_day = day
+                ids.append(measurement["id"])
+                updated_ats.append(measurement["updated_at"])
             
-            offset += len(measurements)
+            # Bulk-export measurements with COPY, parsing rows straight into the builder
+            sink = MeasurementCopySink(on_row)
+            total_archived = self.db.copy_clean_measurements(start_date, end_date, sink)
             
-            if len(measurements) < self.cfg.batch_size:
-                break
-        
-        # Build and upload archives for each day
-        for day in builder.get_all_days():
-            archive = builder.build_archive_for_day(day)
-            compressed = compress_archive(archive)
-            
-            try:
-                url = self.uploader.upload_archive(day, compressed)
-                archives_created += 1
-                logger.info(f"Created archive for {day}: {url}")
-            except Exception as e:
-                logger.error(f"Failed to create archive for {day}: {e}")
-                # Continue with other days
+            if current_day is not None:
+                submit_day(current_day)
         
         return {
             "archived": total_archived,
-            "archives_created": archives_created
+            "archives_created": sum(uploaded for uploaded, _ in uploads.results),
+            "deleted": sum(deleted for _, deleted in uploads.results)
         }
+    
+    def _archive_with_db_json(
+        self,
+        start_date: datetime,
+        last_date: datetime,
+        end_date: datetime
+    ) -> dict[str, int]:
+        """
+        Archive with Postgres rendering each day's JSON
+        
+        A day's rows are deleted only after its upload succeeds, so a failed
+        upload leaves that day's rows in place.
+        """
+        day = start_date.date()
+        with _DayPipeline(self.db.archive_day, self.cfg.upload_concurrency) as days:
+            while day <= last_date.date():
+                days.submit(day.isoformat(), start_date, end_date, self._upload_day)
+                day += timedelta(days=1)
+        
+        return {
+            "archived": sum(count for count, _, _ in days.results),
+            "archives_created": sum(uploaded for _, _, uploaded in days.results),
+            "deleted": sum(deleted for _, deleted, _ in days.results)
+        }
+    
+    def _upload_built_day(
+        self,
+        day: str,
+        archive: dict[str, Any],
+        ids: list[int],
+        updated_ats: list[datetime]
+    ) -> tuple[bool, int]:
+        """
+        Upload a day built in Python, then delete the rows it archived
+        
+        Only the uploaded row versions are deleted, on a pooled connection, so
+        the COPY on the main connection keeps streaming. Failed days keep
+        their rows.
+        
+        Returns:
+            Tuple of (whether the archive was uploaded, rows deleted)
+        """
+        if not self._upload_day(day, archive):
+            return False, 0
+        if self.cfg.dry_run:
+            return True, 0
+        return True, self.db.delete_archived_rows(day, ids, updated_ats)
+    
+    def _upload_day(self, day: str, archive: Union[dict[str, Any], bytes]) -> bool:
+        """
+        Compress and upload the archive for a completed day
+        
+        Runs on the upload thread pool; failures are logged, not raised.
+        
+        Args:
+            day: Day key in format YYYY-MM-DD
+            archive: Archive JSON structure for the day, or its encoded JSON
+            
+        Returns:
+            True if the archive was uploaded
+        """
+        payload, codec = encode_archive(
+            archive,
+            self.cfg.compression,
+            self.compression_level,
+            self.cfg.min_compress_bytes
+        )
+        
+        try:
+            url = self.uploader.upload_archive(day, payload, codec)
+            logger.info(f"Created archive for {day}: {url}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to create archive for {day}: {e}")
+            # Continue with other days
+            return False
 
 
 def run_archiver(cfg: Optional[ArchiverConfig] = None) -> dict[str, int]:
@@ -11,6 +11,8 @@ from typing import Optional
 
 from dotenv import load_dotenv
 
+from ..blob import BLOB_MIN_PART_SIZE_MB
+
 
 def _get_database_url() -> str:
     """Get database URL with support for Heroku's dynamic env variable names.
@@ -47,6 +49,17 @@ class ArchiverConfig:
     
     # Processing options
     batch_size: int = 1000  # Number of records to process at once
+    delete_batch_size: int = 10000  # Rows deleted per transaction
+    upload_concurrency: int = 8  # Number of archives uploaded in parallel
+    multipart_threshold_mb: int = 8  # Archives at least this large use multipart upload
+    upload_part_concurrency: int = 4  # Parallel parts per multipart upload
+    max_part_size_mb: int = 8  # Size of each multipart part (the last may be smaller)
+    upload_timeout_s: int = 60  # Per-request timeout for blob uploads
+    db_json: bool = True  # Build archive JSON in Postgres instead of Python
+    compression: str = "zstd"  # Archive codec: "zstd" or "gzip"
+    zstd_level: int = 3  # zstd compression level (1-22)
+    gzip_level: int = 1  # gzip compression level (1 = fastest, 9 = smallest)
+    min_compress_bytes: int = 256  # Archives smaller than this are uploaded as plain JSON
     dry_run: bool = False  # If True, don't delete or upload
     
 
@@ -81,6 +94,16 @@ def load() -> ArchiverConfig:
     if not blob_base_url:
         raise RuntimeError("VERCEL_BLOB_BASE_URL must be set")
 
+    compression = os.getenv("ARCHIVER_COMPRESSION", "zstd").strip().lower()
+    if compression not in {"zstd", "gzip"}:
+        raise RuntimeError(f"ARCHIVER_COMPRESSION must be 'zstd' or 'gzip', got {compression!r}")
+
+    max_part_size_mb = _parse_int(os.getenv("ARCHIVER_MAX_PART_SIZE_MB"), 8)
+    if max_part_size_mb < BLOB_MIN_PART_SIZE_MB:
+        raise RuntimeError(
+            f"ARCHIVER_MAX_PART_SIZE_MB must be at least {BLOB_MIN_PART_SIZE_MB} (the Blob API minimum), got {max_part_size_mb}"
+        )
+
     return ArchiverConfig(
         database_url=database_url,
         blob_token=blob_token,
@@ -88,5 +111,16 @@ def load() -> ArchiverConfig:
         raw_retention_days=_parse_int(os.getenv("ARCHIVER_RAW_RETENTION_DAYS"), 1),
         clean_retention_days=_parse_int(os.getenv("ARCHIVER_CLEAN_RETENTION_DAYS"), 30),
         batch_size=_parse_int(os.getenv("ARCHIVER_BATCH_SIZE"), 1000),
+        delete_batch_size=max(1, _parse_int(os.getenv("ARCHIVER_DELETE_BATCH_SIZE"), 10000)),
+        upload_concurrency=max(1, _parse_int(os.getenv("ARCHIVER_UPLOAD_CONCURRENCY"), 8)),
+        multipart_threshold_mb=_parse_int(os.getenv("ARCHIVER_MULTIPART_THRESHOLD_MB"), 8),
+        upload_part_concurrency=max(1, _parse_int(os.getenv("ARCHIVER_UPLOAD_PART_CONCURRENCY"), 4)),
+        max_part_size_mb=max_part_size_mb,
+        upload_timeout_s=_parse_int(os.getenv("ARCHIVER_UPLOAD_TIMEOUT_S"), 60),
+        db_json=_parse_bool(os.getenv("ARCHIVER_DB_JSON"), True),
+        compression=compression,
+        zstd_level=_parse_int(os.getenv("ARCHIVER_ZSTD_LEVEL"), 3),
+        gzip_level=_parse_int(os.getenv("ARCHIVER_GZIP_LEVEL"), 1),
+        min_compress_bytes=_parse_int(os.getenv("ARCHIVER_MIN_COMPRESS_BYTES"), 256),
         dry_run=_parse_bool(os.getenv("ARCHIVER_DRY_RUN"), False),
     )
@@ -4,17 +4,146 @@ Database operations for the archiver service
 
 from __future__ import annotations
 
+import csv
+import io
 import logging
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Iterator, Optional, Sequence
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 
 from .config import ArchiverConfig
 
 logger = logging.getLogger(__name__)
 
+COPY_NULL = r"\N"
+
+# Renders one day's archive document server-side from the rows produced by the
+# {source} CTE. json_* (not jsonb_*) keeps key order, and timestamptz values
+# serialize as ISO 8601 like isoformat(). Sensors are listed in order of first
+# appearance in the day's (ts, sensor_id)-ordered rows, as ArchiveBuilder does.
+# The (id, updated_at) keys of the archived rows come back alongside, so only
+# those row versions are deleted after the upload.
+DAY_ARCHIVE_SQL = """
+WITH archived AS (
+    {source}
+),
+per_sensor AS (
+    SELECT
+        sensor_id,
+        COUNT(*) AS measurement_count,
+        MIN(ts) AS first_ts,
+        json_agg(
+            json_build_object(
+                'time', ts,
+                'measurement', value_mm,
+                'qc_flags', qc_flags,
+                'imputation_method', imputation_method
+            )
+            ORDER BY ts
+        ) AS measurements
+    FROM archived
+    GROUP BY sensor_id
+)
+SELECT
+    SUM(measurement_count)::bigint AS measurement_count,
+    json_build_object(
+        'day', %(day)s,
+        'data', json_agg(
+            json_build_object(
+                'sensor', sensor_id,
+                'measurements', measurements
+            )
+            ORDER BY first_ts, sensor_id
+        )
+    )::text AS archive_json,
+    (SELECT array_agg(id) FROM archived) AS ids,
+    (SELECT array_agg(updated_at) FROM archived) AS updated_ats
+FROM per_sensor
+"""
+
+# Half-open day range, clipped to the archive range. clean_measurements_ts_brin
+# answers these with a bitmap scan over the few heap blocks that hold the day,
+# since rows are inserted in roughly ts order. If the table is ever partitioned
+# by day, the rows for a fully archived day can be dropped with DETACH
+# PARTITION + DROP TABLE instead of deleting them.
+DAY_ARCHIVE_RANGE = """
+    ts >= GREATEST(%(start)s, %(day)s::timestamptz)
+    AND ts < LEAST(%(end)s, %(day)s::timestamptz + interval '1 day')
+"""
+
+# Deletes exactly the archived row versions: rows inserted after the archive
+# was read, or updated since (which bumps updated_at), stay for the next run
+DELETE_ARCHIVED_ROWS_SQL = """
+DELETE FROM shizuku.clean_measurements AS cm
+USING unnest(%s::bigint[], %s::timestamptz[]) AS archived(id, updated_at)
+WHERE cm.id = archived.id AND cm.updated_at = archived.updated_at
+"""
+
+SELECT_DAY_ARCHIVE_SQL = DAY_ARCHIVE_SQL.format(source=f"""
+    SELECT id, updated_at, sensor_id, ts, value_mm, qc_flags, imputation_method
+    FROM shizuku.clean_measurements
+    WHERE {DAY_ARCHIVE_RANGE}
+""")
+
+
+def _parse_copy_row(fields: list[str]) -> dict:
+    """Convert one CSV row from COPY into a measurement dictionary"""
+    row_id, updated_at, sensor_id, ts, value_mm, qc_flags, imputation_method = fields
+    return {
+        "id": int(row_id),
+        "updated_at": datetime.fromisoformat(updated_at),
+        "sensor_id": sensor_id,
+        "ts": datetime.fromisoformat(ts),
+        "value_mm": None if value_mm == COPY_NULL else float(value_mm),
+        "qc_flags": None if qc_flags == COPY_NULL else int(qc_flags),
+        "imputation_method": None if imputation_method == COPY_NULL else imputation_method,
+    }
+
+
+class MeasurementCopySink(io.TextIOBase):
+    """
+    File-like target for ``COPY ... TO STDOUT`` that parses rows as they arrive
+    
+    psycopg2 writes one row per ``write`` call; the sink buffers roughly
+    ``buffer_size`` characters and parses them in one ``csv.reader`` pass,
+    handing each measurement dictionary to ``on_row`` in stream order.
+    Call ``flush`` once the COPY finishes to deliver the tail.
+    """
+    
+    def __init__(self, on_row: Callable[[dict], None], buffer_size: int = 1 << 16):
+        self.on_row = on_row
+        self.rows = 0
+        self.buffer_size = buffer_size
+        self._chunks: list[str] = []
+        self._buffered = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data: str) -> int:
+        self._chunks.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.buffer_size:
+            self._drain()
+        return len(data)
+    
+    def flush(self) -> None:
+        self._drain()
+    
+    def _drain(self) -> None:
+        lines = "".join(self._chunks).split("\n")
+        # Keep a trailing partial line for the next batch
+        tail = lines.pop()
+        self._chunks = [tail] if tail else []
+        self._buffered = len(tail)
+        on_row = self.on_row
+        for fields in csv.reader(lines):
+            on_row(_parse_copy_row(fields))
+        self.rows += len(lines)
 
 class ArchiveDatabase:
     """Database operations for archiving measurements"""
@@ -22,6 +151,9 @@ class ArchiveDatabase:
     def __init__(self, cfg: ArchiverConfig):
         self.cfg = cfg
         self.conn: Optional[psycopg2.extensions.connection] = None
+        # Connections for days archived in parallel, opened on demand and
+        # capped at one per upload worker
+        self._day_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
     
     def connect(self) -> None:
         """Establish database connection"""
@@ -31,9 +163,18 @@ class ArchiveDatabase:
                 cursor_factory=psycopg2.extras.RealDictCursor
             )
             logger.info("Connected to database")
+        if self._day_pool is None or self._day_pool.closed:
+            self._day_pool = psycopg2.pool.ThreadedConnectionPool(
+                0,
+                max(1, self.cfg.upload_concurrency),
+                self.cfg.database_url,
+                cursor_factory=psycopg2.extras.RealDictCursor
+            )
     
     def close(self) -> None:
         """Close database connection"""
+        if self._day_pool is not None and not self._day_pool.closed:
+            self._day_pool.closeall()
         if self.conn and not self.conn.closed:
             self.conn.close()
             logger.info("Closed database connection")
@@ -45,6 +186,52 @@ class ArchiveDatabase:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
     
+    def _delete_in_batches(
+        self,
+        table: str,
+        condition: str,
+        params: tuple,
+        conn: Optional[psycopg2.extensions.connection] = None
+    ) -> int:
+        """
+        Delete matching rows in chunks of ``delete_batch_size``, committing each
+        
+        Short transactions keep row locks and WAL bursts small and let
+        autovacuum keep up, unlike a single table-wide DELETE.
+        
+        Args:
+            table: Fully qualified table name (trusted, not user input)
+            condition: SQL WHERE condition with %s placeholders
+            params: Parameters for the condition
+            conn: Connection to delete on (defaults to the main connection)
+            
+        Returns:
+            Total number of rows deleted
+        """
+        conn = conn or self.conn
+        batch_size = self.cfg.delete_batch_size
+        query = f"""
+            WITH victims AS (
+                SELECT ctid FROM {table}
+                WHERE {condition}
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            DELETE FROM {table}
+            WHERE ctid = ANY(ARRAY(SELECT ctid FROM victims))
+        """
+        total = 0
+        with conn.cursor() as cur:
+            while True:
+                cur.execute(query, (*params, batch_size))
+                deleted = cur.rowcount
+                conn.commit()
+                total += deleted
+                if deleted < batch_size:
+                    break
+                logger.debug(f"Deleted {total} rows from {table} so far")
+        return total
+    
     def delete_old_raw_measurements(self, cutoff_date: datetime) -> int:
         """
         Delete raw measurements older than cutoff_date
@@ -66,39 +253,40 @@ class ArchiveDatabase:
                 logger.info(f"[DRY RUN] Would delete {count} raw measurements")
                 return count
         
-        with self.conn.cursor() as cur:
-            cur.execute(
-                "DELETE FROM shizuku.raw_measurements WHERE ts < %s",
-                (cutoff_date,)
-            )
-            deleted = cur.rowcount
-            self.conn.commit()
-            logger.info(f"Deleted {deleted} raw measurements older than {cutoff_date}")
-            return deleted
+        deleted = self._delete_in_batches(
+            "shizuku.raw_measurements",
+            "ts < %s",
+            (cutoff_date,)
+        )
+        logger.info(f"Deleted {deleted} raw measurements older than {cutoff_date}")
+        return deleted
     
-    def fetch_clean_measurements_to_archive(
+    def copy_clean_measurements(
         self,
         start_date: datetime,
         end_date: datetime,
-        batch_size: int = 1000,
-        offset: int = 0
-    ) -> list[dict]:
+        sink: MeasurementCopySink
+    ) -> int:
         """
-        Fetch clean measurements to archive
+        Bulk-export clean measurements to archive with ``COPY ... TO STDOUT``
+        
+        COPY streams plain CSV over the wire, skipping per-row cursor decoding
+        and dict construction; ``sink`` parses the rows on the fly.
         
         Args:
             start_date: Start of date range (inclusive)
             end_date: End of date range (exclusive)
-            batch_size: Number of records to fetch
-            offset: Offset for pagination
+            sink: Sink receiving the CSV stream, ordered by (ts, sensor_id)
             
         Returns:
-            List of measurement dictionaries
+            Number of rows exported
         """
         with self.conn.cursor() as cur:
-            cur.execute(
+            query = cur.mogrify(
                 """
                 SELECT 
+                    id,
+                    updated_at,
                     sensor_id,
                     ts,
                     value_mm,
@@ -107,11 +295,110 @@ class ArchiveDatabase:
                 FROM shizuku.clean_measurements
                 WHERE ts >= %s AND ts < %s
                 ORDER BY ts, sensor_id
-                LIMIT %s OFFSET %s
                 """,
-                (start_date, end_date, batch_size, offset)
+                (start_date, end_date)
+            ).decode()
+            cur.copy_expert(
+                f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                sink
             )
-            return cur.fetchall()
+        sink.flush()
+        return sink.rows
+    
+    @contextmanager
+    def _pooled(self) -> Iterator[psycopg2.extensions.connection]:
+        """Check out a day connection for the duration of the block"""
+        conn = self._day_pool.getconn()
+        try:
+            yield conn
+        finally:
+            self._day_pool.putconn(conn)
+    
+    def archive_day(
+        self,
+        day: str,
+        start_date: datetime,
+        end_date: datetime,
+        upload: Callable[[str, bytes], bool]
+    ) -> tuple[int, int, bool]:
+        """
+        Archive one day of clean measurements, deleting its rows once uploaded
+        
+        Postgres renders the day's archive JSON, and the keys of the rows it
+        contains, in a read-only query whose transaction ends before ``upload``
+        runs, so no snapshot or row lock is held across the network call. Only
+        if the upload succeeded are exactly those rows removed; otherwise they
+        stay. In dry-run mode nothing is deleted.
+        
+        Runs on a pooled connection so several days can be archived in parallel.
+        
+        Args:
+            day: Day key in format YYYY-MM-DD (session time zone)
+            start_date: Start of the overall archive range (inclusive)
+            end_date: End of the overall archive range (exclusive)
+            upload: Callable receiving (day, archive JSON bytes), returning success
+            
+        Returns:
+            Tuple of (measurements archived, rows deleted, whether an archive
+            was uploaded)
+        """
+        with self._pooled() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SELECT_DAY_ARCHIVE_SQL, {"day": day, "start": start_date, "end": end_date})
+                row = cur.fetchone()
+            conn.rollback()
+            
+            count = row["measurement_count"] or 0
+            if count == 0:
+                return 0, 0, False
+            
+            if not upload(day, row["archive_json"].encode("utf-8")):
+                return 0, 0, False
+            deleted = 0
+            if not self.cfg.dry_run:
+                deleted = self.delete_archived_rows(day, row["ids"], row["updated_ats"], conn)
+            return count, deleted, True
+    
+    def delete_archived_rows(
+        self,
+        day: str,
+        ids: Sequence[int],
+        updated_ats: Sequence[datetime],
+        conn: Optional[psycopg2.extensions.connection] = None
+    ) -> int:
+        """
+        Delete the archived versions of one day's clean measurements
+        
+        Rows are matched on (id, updated_at) as they were read for the archive,
+        in chunks of ``delete_batch_size`` keys, each committed separately.
+        
+        Args:
+            day: Day key in format YYYY-MM-DD, for logging
+            ids: Ids of the archived rows
+            updated_ats: updated_at of each archived row, parallel to ids
+            conn: Connection to delete on (defaults to a pooled day connection)
+            
+        Returns:
+            Number of rows deleted
+        """
+        if conn is None:
+            with self._pooled() as conn:
+                return self.delete_archived_rows(day, ids, updated_ats, conn)
+        
+        batch_size = self.cfg.delete_batch_size
+        deleted = 0
+        with conn.cursor() as cur:
+            for offset in range(0, len(ids), batch_size):
+                cur.execute(
+                    DELETE_ARCHIVED_ROWS_SQL,
+                    (list(ids[offset:offset + batch_size]), list(updated_ats[offset:offset + batch_size]))
+                )
+                deleted += cur.rowcount
+                conn.commit()
+        if deleted < len(ids):
+            logger.info(f"{len(ids) - deleted} rows for {day} changed after archiving; kept for the next run")
+        logger.info(f"Deleted {deleted} archived clean measurements for {day}")
+        return deleted
     
     def get_date_range_for_archiving(self, cutoff_date: datetime) -> tuple[datetime, datetime]:
         """
@@ -138,47 +425,3 @@ class ArchiveDatabase:
             if result["min_ts"] is None:
                 return None, None
             return result["min_ts"], result["max_ts"]
-    
-    def delete_archived_measurements(
-        self,
-        start_date: datetime,
-        end_date: datetime
-    ) -> int:
-        """
-        Delete clean measurements that have been archived
-        
-        Args:
-            start_date: Start of date range (inclusive)
-            end_date: End of date range (exclusive)
-            
-        Returns:
-            Number of rows deleted
-        """
-        if self.cfg.dry_run:
-            with self.conn.cursor() as cur:
-                cur.execute(
-                    "SELECT COUNT(*) as count FROM shizuku.clean_measurements WHERE ts >= %s AND ts < %s",
-                    (start_date, end_date)
-                )
-                count = cur.fetchone()["count"]
-                logger.info(f"[DRY RUN] Would delete {count} archived clean measurements")
-                return count
-        
-        with self.conn.cursor() as cur:
-            cur.execute(
-                "DELETE FROM shizuku.clean_measurements WHERE ts >= %s AND ts < %s",
-                (start_date, end_date)
-            )
-            deleted = cur.rowcount
-            self.conn.commit()
-            logger.info(f"Deleted {deleted} archived clean measurements")
-            return deleted
-    
-    def count_measurements_to_archive(self, cutoff_date: datetime) -> int:
-        """Count how many clean measurements need to be archived"""
-        with self.conn.cursor() as cur:
-            cur.execute(
-                "SELECT COUNT(*) as count FROM shizuku.clean_measurements WHERE ts < %s",
-                (cutoff_date,)
-            )
-            return cur.fetchone()["count"]
@@ -4,7 +4,7 @@ Main entry point for the archiver service
 
 import logging
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 
 from .archiver import run_archiver
 from .config import load
@@ -25,7 +25,7 @@ def main():
     """Main entry point"""
     logger.info("=" * 80)
     logger.info("Starting Data Archiver Service")
-    logger.info(f"Run time: {datetime.utcnow().isoformat()}")
+    logger.info(f"Run time: {datetime.now(timezone.utc).isoformat()}")
     logger.info("=" * 80)
     
     try:
@@ -35,6 +35,11 @@ def main():
         logger.info(f"  Raw retention: {cfg.raw_retention_days} days")
         logger.info(f"  Clean retention: {cfg.clean_retention_days} days")
         logger.info(f"  Batch size: {cfg.batch_size}")
+        logger.info(f"  Delete batch size: {cfg.delete_batch_size}")
+        logger.info(f"  Compression: {cfg.compression}")
+        logger.info(f"  Min compress size: {cfg.min_compress_bytes} bytes")
+        logger.info(f"  Upload concurrency: {cfg.upload_concurrency}")
+        logger.info(f"  Build JSON in database: {cfg.db_json}")
         logger.info(f"  Dry run: {cfg.dry_run}")
         
         if cfg.dry_run:
@@ -4,11 +4,14 @@ Test script for the archiver service
 Run with: python -m archiver.test_archiver
 """
 
-import json
+import gzip
 import logging
 from datetime import datetime, timedelta
 
-from .archive_builder import ArchiveBuilder, compress_archive
+import orjson
+import zstandard
+
+from .archive_builder import ArchiveBuilder, compress_archive, encode_archive
 from .config import ArchiverConfig
 
 logging.basicConfig(level=logging.INFO)
@@ -68,7 +71,7 @@ def test_archive_builder():
     assert isinstance(archive["data"], list), "Archive 'data' should be a list"
     
     logger.info(f"Archive for {days[0]}:")
-    logger.info(json.dumps(archive, indent=2))
+    logger.info(orjson.dumps(archive, option=orjson.OPT_INDENT_2).decode())
     
     # Verify sensors
     sensors_dict = {item["sensor"]: item for item in archive["data"]}
@@ -85,8 +88,17 @@ def test_archive_builder():
     # Test compression
     compressed = compress_archive(archive)
     logger.info(f"Compressed size: {len(compressed)} bytes")
-    logger.info(f"Original JSON size: {len(json.dumps(archive))} bytes")
-    logger.info(f"Compression ratio: {len(json.dumps(archive)) / len(compressed):.2f}x")
+    logger.info(f"Original JSON size: {len(orjson.dumps(archive))} bytes")
+    logger.info(f"Compression ratio: {len(orjson.dumps(archive)) / len(compressed):.2f}x")
+    
+    # Both codecs must round-trip to the same JSON
+    expected = orjson.dumps(archive)
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(compressed) == expected
+    assert gzip.decompress(compress_archive(archive, "gzip", 1)) == expected
+    
+    # Tiny archives skip compression entirely
+    assert encode_archive(archive, "zstd", 3, len(expected) + 1) == (expected, "none")
+    assert encode_archive(archive, "zstd", 3, len(expected))[1] == "zstd"
     
     logger.info("✅ ArchiveBuilder tests passed!")
 
@@ -124,10 +136,35 @@ def test_archive_format():
     assert measurement["measurement"] == 10.5
     
     logger.info("Archive structure:")
-    logger.info(json.dumps(archive, indent=2))
+    logger.info(orjson.dumps(archive, option=orjson.OPT_INDENT_2).decode())
     logger.info("✅ Archive format matches specification!")
 
 
+def test_streaming_days():
+    """Test that days can be flushed from the builder as the stream advances"""
+    logger.info("Testing day-by-day flushing...")
+    
+    builder = ArchiveBuilder()
+    day = builder.add_measurement({
+        "sensor_id": "sensor_001",
+        "ts": datetime(2025, 1, 15, 23, 50, 0),
+        "value_mm": 1.0,
+    })
+    assert day == "2025-01-15", f"Unexpected day key {day}"
+    
+    next_day = builder.add_measurement({
+        "sensor_id": "sensor_001",
+        "ts": datetime(2025, 1, 16, 0, 0, 0),
+        "value_mm": 2.0,
+    })
+    assert next_day == "2025-01-16", f"Unexpected day key {next_day}"
+    
+    builder.drop_day(day)
+    assert builder.get_all_days() == ["2025-01-16"], "Flushed day should be released"
+    
+    logger.info("✅ Day flushing tests passed!")
+
+
 def main():
     """Run all tests"""
     logger.info("=" * 80)
@@ -138,6 +175,8 @@ def main():
         test_archive_builder()
         print()
         test_archive_format()
+        print()
+        test_streaming_days()
         
         logger.info("=" * 80)
         logger.info("All tests passed! ✅")
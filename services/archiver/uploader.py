@@ -5,22 +5,38 @@ Blob storage uploader for archives
 from __future__ import annotations
 
 import logging
-import os
-
-import vercel_blob
+from typing import Optional
 
+from ..blob import BlobClient, upload_retry
+from .archive_builder import ARCHIVE_FORMATS
 from .config import ArchiverConfig
 
 logger = logging.getLogger(__name__)
 
+_upload_retry = upload_retry(logger, attempts=5, max_wait_s=30)
+
 
 class ArchiveUploader:
     """Uploads archive files to blob storage"""
     
     def __init__(self, cfg: ArchiverConfig):
         self.cfg = cfg
-        # Set token for vercel_blob library
-        os.environ["BLOB_READ_WRITE_TOKEN"] = cfg.blob_token
+        self._blob = BlobClient(
+            cfg.blob_token,
+            cfg.upload_timeout_s,
+            cfg.upload_part_concurrency,
+            cfg.max_part_size_mb * 1024 * 1024
+        )
+    
+    @_upload_retry
+    def _put(self, key: str, data: bytes, content_type: str) -> dict:
+        """PUT a blob in a single request"""
+        return self._blob.put(key, data, content_type)
+    
+    @_upload_retry
+    def _put_multipart(self, key: str, data: bytes, content_type: str) -> dict:
+        """Upload a large blob as parallel multipart parts"""
+        return self._blob.put_multipart(key, data, content_type)
     
     def _resolve_url(self, info: dict, fallback_key: str) -> str:
         """Resolve the final URL from blob upload response"""
@@ -30,34 +46,35 @@ class ArchiveUploader:
         pathname = info.get("pathname") or fallback_key
         return f"{self.cfg.blob_base_url}/{pathname.lstrip('/')}"
     
-    def upload_archive(self, day: str, compressed_data: bytes) -> str:
+    def upload_archive(self, day: str, compressed_data: bytes, codec: Optional[str] = None) -> str:
         """
         Upload compressed archive to blob storage
         
         Args:
             day: Day in format YYYY-MM-DD
-            compressed_data: Gzipped JSON data
+            compressed_data: Encoded JSON data
+            codec: Codec the data was encoded with (defaults to cfg.compression)
             
         Returns:
             URL of uploaded blob
         """
-        # Create blob key with path structure: archives/YYYY/MM/archive-YYYY-MM-DD.json.gz
+        # Create blob key with path structure: archives/YYYY/MM/archive-YYYY-MM-DD.json.zst
+        extension, content_type = ARCHIVE_FORMATS[codec or self.cfg.compression]
         year, month, _ = day.split("-")
-        key = f"archives/{year}/{month}/archive-{day}.json.gz"
+        key = f"archives/{year}/{month}/archive-{day}{extension}"
         
         if self.cfg.dry_run:
             logger.info(f"[DRY RUN] Would upload {len(compressed_data)} bytes to {key}")
             return f"[dry-run]{key}"
         
+        # Large archives go up as parallel multipart parts instead of one stream
+        multipart = len(compressed_data) >= self.cfg.multipart_threshold_mb * 1024 * 1024
+        
         try:
-            info = vercel_blob.put(
-                key,
-                compressed_data,
-                {
-                    "contentType": "application/json+gzip",
-                    "allowOverwrite": True
-                }
-            )
+            if multipart:
+                info = self._put_multipart(key, compressed_data, content_type)
+            else:
+                info = self._put(key, compressed_data, content_type)
             url = self._resolve_url(info, key)
             logger.info(f"Uploaded archive for {day} to {url} ({len(compressed_data)} bytes)")
             return url
@@ -0,0 +1,159 @@
+"""
+Minimal Vercel Blob API client shared by the ETL and archiver uploaders
+
+vercel_blob opens a fresh session (and TLS handshake) per request, derives the
+content type from the path and ignores the caller's timeout for multipart
+parts, so the services talk to the API directly through this client instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+BLOB_API_URL = "https://blob.vercel-storage.com"
+BLOB_API_VERSION = "10"
+BLOB_CACHE_MAX_AGE = "31536000"
+# Every multipart part but the last must be at least 5 MiB
+BLOB_MIN_PART_SIZE_MB = 5
+BLOB_MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+# Errors worth retrying: network failures and timeouts, and 429/5xx responses
+# surfaced as HTTPError
+RETRYABLE_UPLOAD_ERRORS = (requests.RequestException, TimeoutError)
+
+
+def upload_retry(logger: logging.Logger, attempts: int, max_wait_s: float):
+    """Retry decorator for transient Blob upload failures, logged to ``logger``"""
+    return retry(
+        stop=stop_after_attempt(attempts),
+        wait=wait_exponential_jitter(initial=1, max=max_wait_s),
+        retry=retry_if_exception_type(RETRYABLE_UPLOAD_ERRORS),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True,
+    )
+
+
+class BlobClient:
+    """Uploads public, overwritable blobs over keep-alive sessions"""
+
+    def __init__(
+        self,
+        token: str,
+        timeout_s: float,
+        part_concurrency: int = 4,
+        part_size: int = BLOB_MULTIPART_PART_SIZE
+    ):
+        if part_size < BLOB_MIN_PART_SIZE_MB * 1024 * 1024:
+            raise ValueError(f"Multipart part size must be at least {BLOB_MIN_PART_SIZE_MB} MiB, got {part_size} bytes")
+        self._token = token
+        self._timeout_s = timeout_s
+        self._part_concurrency = part_concurrency
+        self._part_size = part_size
+        # One keep-alive session per upload thread (Session is not thread-safe)
+        self._local = threading.local()
+        # Long-lived part workers, created on first use so their sessions are
+        # reused across multipart uploads
+        self._parts: ThreadPoolExecutor | None = None
+        self._parts_lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _part_pool(self) -> ThreadPoolExecutor:
+        with self._parts_lock:
+            if self._parts is None:
+                self._parts = ThreadPoolExecutor(max_workers=self._part_concurrency)
+            return self._parts
+
+    def _headers(self, content_type: str) -> dict[str, str]:
+        return {
+            "access": "public",
+            "authorization": f"Bearer {self._token}",
+            "x-api-version": BLOB_API_VERSION,
+            "x-content-type": content_type,
+            "x-cache-control-max-age": BLOB_CACHE_MAX_AGE,
+            "x-allow-overwrite": "1",
+        }
+
+    def _request(self, method: str, url: str, headers: dict[str, str], **kwargs) -> dict:
+        """
+        Send one Blob API request on this thread's pooled connection
+
+        429 and 5xx responses raise ``requests.HTTPError`` (a
+        ``requests.RequestException``, like network errors and timeouts);
+        any other non-200 response raises ``RuntimeError``.
+        """
+        resp = self._session().request(
+            method,
+            url,
+            headers=headers,
+            timeout=self._timeout_s,
+            **kwargs
+        )
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise requests.HTTPError(
+                f"Blob API error (status {resp.status_code}): {resp.text}", response=resp
+            )
+        if resp.status_code != 200:
+            raise RuntimeError(f"Blob API rejected upload (status {resp.status_code}): {resp.text}")
+        return resp.json()
+
+    def put(self, pathname: str, data: bytes, content_type: str) -> dict:
+        """PUT a blob in a single request, returning the API's blob info"""
+        return self._request("PUT", f"{BLOB_API_URL}/?pathname={pathname}", self._headers(content_type), data=data)
+
+    def put_multipart(self, pathname: str, data: bytes, content_type: str) -> dict:
+        """Upload a large blob as parallel multipart parts, returning its blob info"""
+        url = f"{BLOB_API_URL}/mpu?pathname={pathname}"
+        headers = self._headers(content_type)
+        upload = self._request("POST", url, {**headers, "x-mpu-action": "create"})
+        part_headers = {
+            **headers,
+            "x-mpu-upload-id": upload["uploadId"],
+            "x-mpu-key": quote(upload["key"], safe=""),
+        }
+
+        part_size = self._part_size
+
+        def put_part(part_number: int) -> dict:
+            start = (part_number - 1) * part_size
+            part = self._request(
+                "POST",
+                url,
+                {
+                    **part_headers,
+                    "x-mpu-action": "upload",
+                    "x-mpu-part-number": str(part_number),
+                    "content-type": "application/octet-stream",
+                },
+                data=data[start:start + part_size]
+            )
+            return {"partNumber": part_number, "etag": part["etag"]}
+
+        part_count = -(-len(data) // part_size)
+        uploaded = list(self._part_pool().map(put_part, range(1, part_count + 1)))
+
+        info = self._request(
+            "POST",
+            url,
+            {**part_headers, "x-mpu-action": "complete", "content-type": "application/json"},
+            json=uploaded
+        )
+        if info.get("contentType", content_type) != content_type:
+            raise RuntimeError(f"Blob API stored {pathname} as {info['contentType']}, expected {content_type}")
+        return info
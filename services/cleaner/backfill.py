@@ -17,50 +17,73 @@ logger = logging.getLogger("cleaner-backfill")
 def run() -> None:
     cfg = load()
     chunk_hours = int(os.getenv("BACKFILL_CHUNK_HOURS", "24"))
+    insert_batch = int(os.getenv("BACKFILL_INSERT_BATCH", "25000"))
+    fetch_rows = int(os.getenv("BACKFILL_FETCH_ROWS", "200000"))
     logger.info(
-        "starting cleaning backfill (chunk=%sh, dry_run=%s)",
+        "starting cleaning backfill (chunk=%sh, insert_batch=%s, dry_run=%s)",
         chunk_hours,
+        insert_batch,
         cfg.dry_run,
     )
 
     db = Database(cfg.database_url)
-    min_ts, max_ts = db.raw_time_bounds()
-    if not min_ts or not max_ts:
-        logger.info("no raw measurements found")
-        return
-
-    logger.info("raw bounds: %s to %s", min_ts, max_ts)
-
-    current = min_ts.floor("1h")
-    chunk_delta = timedelta(hours=chunk_hours)
-
-    processed = 0
-    inserted = 0
+    # One connection for the whole run instead of a checkout per query
+    with db.session():
+        min_ts, max_ts = db.raw_time_bounds()
+        if not min_ts or not max_ts:
+            logger.info("no raw measurements found")
+            return
+
+        logger.info("raw bounds: %s to %s", min_ts, max_ts)
+
+        current = min_ts
+        chunk_delta = timedelta(hours=chunk_hours)
+
+        processed = 0
+        inserted = 0
+        # Cleaned windows waiting to be written in one transaction
+        pending: list[pd.DataFrame] = []
+        pending_rows = 0
+
+        def flush() -> int:
+            nonlocal pending_rows
+            if not pending:
+                return 0
+            batch = pd.concat(pending, ignore_index=True)
+            pending.clear()
+            pending_rows = 0
+            inserted_rows = db.insert_clean_measurements(batch)
+            logger.info("inserted %s rows", inserted_rows)
+            return inserted_rows
+
+        while current < max_ts:
+            window_end = min(current + chunk_delta, max_ts + timedelta(hours=1))
+            logger.info("processing window %s → %s", current, window_end)
+            window_rows = 0
+            # Each streamed frame holds complete sensors, so frames clean independently
+            for raw_df in db.iter_raw_range(current, window_end, fetch_rows):
+                window_rows += len(raw_df)
+                cleaned_df = clean_measurements(raw_df, cfg)
+
+                if cleaned_df.empty:
+                    logger.info("no cleaned rows produced for window")
+                elif cfg.dry_run:
+                    logger.info("dry-run: %s cleaned rows (first=%s)", len(cleaned_df), cleaned_df.iloc[0].to_dict())
+                else:
+                    pending.append(cleaned_df)
+                    pending_rows += len(cleaned_df)
+                    if pending_rows >= insert_batch:
+                        inserted += flush()
+
+            if not window_rows:
+                logger.info("window empty; skipping")
+            processed += window_rows
 
-    while current < max_ts:
-        window_end = min(current + chunk_delta, max_ts + timedelta(hours=1))
-        logger.info("processing window %s → %s", current, window_end)
-        raw_df = db.fetch_raw_range(current, window_end)
-        if raw_df.empty:
-            logger.info("window empty; skipping")
             current = window_end
-            continue
-
-        cleaned_df = clean_measurements(raw_df, cfg)
-        processed += len(raw_df)
-
-        if cleaned_df.empty:
-            logger.info("no cleaned rows produced for window")
-        elif cfg.dry_run:
-            logger.info("dry-run: %s cleaned rows (first=%s)", len(cleaned_df), cleaned_df.head(1))
-        else:
-            inserted_rows = db.insert_clean_measurements(cleaned_df.to_dict(orient="records"))
-            inserted += inserted_rows
-            logger.info("inserted %s rows", inserted_rows)
 
-        current = window_end
+        inserted += flush()
 
-    logger.info("finished backfill processed=%s inserted=%s", processed, inserted)
+        logger.info("finished backfill processed=%s inserted=%s", processed, inserted)
 
 
 def main() -> None:
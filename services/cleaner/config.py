@@ -1,15 +1,30 @@
 from __future__ import annotations
 
+import functools
 import os
+import threading
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 from dotenv import load_dotenv
 
+_dotenv_lock = threading.Lock()
+_dotenv_loaded = False
 
-def _get_database_url() -> str:
+
+def _load_dotenv_once() -> None:
+    """Read .env at most once per process."""
+    global _dotenv_loaded
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            load_dotenv(dotenv_path=Path(".env"), override=False)
+            _dotenv_loaded = True
+
+
+def _get_database_url(env: Mapping[str, str]) -> str:
     """Get database URL with support for Heroku's dynamic env variable names.
     
     Reads DB_ENV_VARIABLE to get the actual env variable name containing the database URL.
@@ -17,8 +32,8 @@ def _get_database_url() -> str:
     Also fixes postgres:// to postgresql:// for Python compatibility.
     """
     # First check if we have an indirection variable
-    db_env_var_name = os.getenv("DB_ENV_VARIABLE", "DATABASE_URL")
-    database_url = os.getenv(db_env_var_name)
+    db_env_var_name = env.get("DB_ENV_VARIABLE", "DATABASE_URL")
+    database_url = env.get(db_env_var_name)
     
     if not database_url:
         raise RuntimeError(f"{db_env_var_name} is required (specified by DB_ENV_VARIABLE={db_env_var_name})")
@@ -30,7 +45,7 @@ def _get_database_url() -> str:
     return database_url
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True)
 class Config:
     database_url: str
     lookback: timedelta
@@ -44,6 +59,7 @@ class Config:
     arima_max_order: int
     arima_seasonal: bool
     arima_m: int
+    workers: int = 1
 
 
 def _parse_float(value: Optional[str], default: float) -> float:
@@ -77,25 +93,30 @@ def _parse_optional_int(value: Optional[str]) -> Optional[int]:
     return int(value)
 
 
+@functools.lru_cache(maxsize=1)
 def load() -> Config:
-    load_dotenv(dotenv_path=Path(".env"), override=False)
+    """Build the process-wide Config; call load.cache_clear() to re-read env."""
+    _load_dotenv_once()
+    # Read-only snapshot so every setting comes from the same environment view
+    env = MappingProxyType(dict(os.environ))
 
-    database_url = _get_database_url()
+    database_url = _get_database_url(env)
 
-    lookback_hours = _parse_int(os.getenv("CLEANER_LOOKBACK_HOURS"), default=72)
+    lookback_hours = _parse_int(env.get("CLEANER_LOOKBACK_HOURS"), default=72)
     lookback = timedelta(hours=lookback_hours)
 
-    min_value = _parse_float(os.getenv("CLEANER_MIN_VALUE_MM"), default=0.0)
-    max_value = _parse_float(os.getenv("CLEANER_MAX_VALUE_MM"), default=150.0)
-    min_quality = _parse_optional_float(os.getenv("CLEANER_MIN_QUALITY"))
-    interpolation_limit = _parse_int(os.getenv("CLEANER_INTERPOLATION_LIMIT"), default=6)
-    dry_run = _parse_bool(os.getenv("DRY_RUN"), default=False)
+    min_value = _parse_float(env.get("CLEANER_MIN_VALUE_MM"), default=0.0)
+    max_value = _parse_float(env.get("CLEANER_MAX_VALUE_MM"), default=150.0)
+    min_quality = _parse_optional_float(env.get("CLEANER_MIN_QUALITY"))
+    interpolation_limit = _parse_int(env.get("CLEANER_INTERPOLATION_LIMIT"), default=6)
+    dry_run = _parse_bool(env.get("DRY_RUN"), default=False)
 
-    arima_enabled = _parse_bool(os.getenv("CLEANER_ARIMA_ENABLED"), default=True)
-    arima_min_train = _parse_int(os.getenv("CLEANER_ARIMA_MIN_TRAIN"), default=48)
-    arima_max_order = _parse_int(os.getenv("CLEANER_ARIMA_MAX_ORDER"), default=3)
-    arima_seasonal = _parse_bool(os.getenv("CLEANER_ARIMA_SEASONAL"), default=True)
-    arima_m = _parse_int(os.getenv("CLEANER_ARIMA_M"), default=24)  # 24 hours for daily seasonality
+    arima_enabled = _parse_bool(env.get("CLEANER_ARIMA_ENABLED"), default=True)
+    arima_min_train = _parse_int(env.get("CLEANER_ARIMA_MIN_TRAIN"), default=48)
+    arima_max_order = _parse_int(env.get("CLEANER_ARIMA_MAX_ORDER"), default=3)
+    arima_seasonal = _parse_bool(env.get("CLEANER_ARIMA_SEASONAL"), default=True)
+    arima_m = _parse_int(env.get("CLEANER_ARIMA_M"), default=24)  # 24 hours for daily seasonality
+    workers = max(1, _parse_int(env.get("CLEANER_WORKERS"), default=1))
 
     return Config(
         database_url=database_url,
@@ -110,4 +131,5 @@ def load() -> Config:
         arima_max_order=arima_max_order,
         arima_seasonal=arima_seasonal,
         arima_m=arima_m,
+        workers=workers,
     )
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import io
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Iterable, Tuple
+from typing import Iterator, Optional, Tuple
 
 import pandas as pd
 import sqlalchemy as sa
 from sqlalchemy import text
-from sqlalchemy.dialects.postgresql import insert
 
 RAW_QUERY = """
 SELECT rm.sensor_id,
@@ -45,66 +46,166 @@ WHERE rm.ts >= :start
 ORDER BY rm.sensor_id, rm.ts
 """
 
+CLEAN_COLUMNS = ["sensor_id", "ts", "value_mm", "qc_flags", "imputation_method", "version"]
+
+STAGE_CLEAN_QUERY = """
+CREATE TEMP TABLE stage_clean ON COMMIT DROP AS
+SELECT sensor_id, ts, value_mm, qc_flags, imputation_method, version
+FROM shizuku.clean_measurements
+WITH NO DATA
+"""
+
+COPY_STAGE_CLEAN_QUERY = """
+COPY stage_clean (sensor_id, ts, value_mm, qc_flags, imputation_method, version)
+FROM STDIN WITH (FORMAT csv)
+"""
+
+UPSERT_CLEAN_QUERY = """
+INSERT INTO shizuku.clean_measurements (sensor_id, ts, value_mm, qc_flags, imputation_method, version)
+SELECT sensor_id, ts, value_mm, qc_flags, imputation_method, version
+FROM stage_clean
+ON CONFLICT (sensor_id, ts, version) DO UPDATE
+SET value_mm = EXCLUDED.value_mm,
+    qc_flags = EXCLUDED.qc_flags,
+    imputation_method = EXCLUDED.imputation_method,
+    updated_at = now()
+"""
+
+# min_ts is floored to the hour so backfill windows start on hour boundaries
 BOUNDS_QUERY = """
-SELECT MIN(ts) AS min_ts, MAX(ts) AS max_ts
+SELECT date_trunc('hour', MIN(ts)) AS min_ts, MAX(ts) AS max_ts
 FROM shizuku.raw_measurements
 WHERE variable = 'precipitacion'
 """
 
 
+def _prepare_raw(df: pd.DataFrame) -> pd.DataFrame:
+    if not df.empty:
+        ts = df["ts"]
+        if isinstance(ts.dtype, pd.DatetimeTZDtype):
+            # read_sql already built a typed column from the driver's datetimes
+            if str(ts.dtype.tz) != "UTC":
+                df["ts"] = ts.dt.tz_convert("UTC")
+        else:
+            df["ts"] = pd.to_datetime(ts, utc=True)
+        # Few distinct sensors over many rows: store ids once as categories
+        df["sensor_id"] = df["sensor_id"].astype("category")
+    return df
+
+
 class Database:
     def __init__(self, url: str) -> None:
-        self.engine = sa.create_engine(url, pool_pre_ping=True, future=True)
-        self._metadata = sa.MetaData()
-        self._clean_table = sa.Table(
-            "clean_measurements",
-            self._metadata,
-            autoload_with=self.engine,
-            schema="shizuku",
+        # A UTC session makes every timestamptz arrive with the same offset, so
+        # read_sql builds datetime64[ns, UTC] columns without reparsing
+        self.engine = sa.create_engine(
+            url,
+            pool_pre_ping=True,
+            pool_size=2,
+            future=True,
+            connect_args={
+                "options": "-c timezone=UTC",
+                # Keep long backfill sessions alive through idle NAT/LB timeouts
+                "keepalives": 1,
+                "keepalives_idle": 30,
+            },
         )
+        self._session_conn: Optional[sa.Connection] = None
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Run every call made inside the block on one checked-out connection.
+
+        Saves a pool checkout (and its pre-ping round trip) per query for
+        long-running jobs such as the backfill.
+        """
+        with self.engine.connect() as conn:
+            self._session_conn = conn
+            try:
+                yield
+            finally:
+                self._session_conn = None
+
+    @contextmanager
+    def _connect(self) -> Iterator[sa.Connection]:
+        if self._session_conn is None:
+            with self.engine.connect() as conn:
+                yield conn
+            return
+        conn = self._session_conn
+        try:
+            yield conn
+        finally:
+            # Don't leave the shared connection idle inside a read transaction
+            if conn.in_transaction():
+                conn.rollback()
 
     def fetch_raw_measurements(self, since: datetime) -> pd.DataFrame:
         stmt = text(RAW_QUERY)
-        df = pd.read_sql(stmt, self.engine, params={"since": since})
-        if not df.empty:
-            df["ts"] = pd.to_datetime(df["ts"], utc=True)
-        return df
-
-    def insert_clean_measurements(self, rows: Iterable[dict]) -> int:
-        rows = list(rows)
-        if not rows:
+        with self._connect() as conn:
+            df = pd.read_sql(stmt, conn, params={"since": since})
+        return _prepare_raw(df)
+
+    def insert_clean_measurements(self, cleaned_df: pd.DataFrame) -> int:
+        """Upsert cleaned rows by COPYing them into a temp table first.
+
+        A single COPY stream avoids parsing and planning one huge
+        parameterized INSERT; the upsert then runs as INSERT ... SELECT.
+        """
+        if cleaned_df.empty:
             return 0
 
-        stmt = insert(self._clean_table).values(rows)
-        update_cols = {
-            "value_mm": stmt.excluded.value_mm,
-            "qc_flags": stmt.excluded.qc_flags,
-            "imputation_method": stmt.excluded.imputation_method,
-            "updated_at": sa.func.now(),
-        }
-
-        with self.engine.begin() as conn:
-            result = conn.execute(
-                stmt.on_conflict_do_update(
-                    index_elements=["sensor_id", "ts", "version"],
-                    set_=update_cols,
-                )
-            )
-        return result.rowcount
+        # Unquoted empty CSV fields load as NULL (e.g. imputation_method=None)
+        buffer = io.StringIO()
+        cleaned_df.to_csv(buffer, columns=CLEAN_COLUMNS, header=False, index=False)
+        buffer.seek(0)
+
+        with self._connect() as conn, conn.begin():
+            # COPY needs the psycopg2 cursor; conn.begin() commits it on exit
+            with conn.connection.cursor() as cur:
+                cur.execute(STAGE_CLEAN_QUERY)
+                cur.copy_expert(COPY_STAGE_CLEAN_QUERY, buffer)
+                cur.execute(UPSERT_CLEAN_QUERY)
+                inserted = cur.rowcount
+        return inserted
 
     def fetch_raw_range(self, start, end) -> pd.DataFrame:
         stmt = text(RAW_RANGE_QUERY)
-        df = pd.read_sql(
-            stmt,
-            self.engine,
-            params={"start": start, "end": end},
-        )
-        if not df.empty:
-            df["ts"] = pd.to_datetime(df["ts"], utc=True)
-        return df
+        with self._connect() as conn:
+            df = pd.read_sql(
+                stmt,
+                conn,
+                params={"start": start, "end": end},
+            )
+        return _prepare_raw(df)
+
+    def iter_raw_range(self, start, end, chunksize: int = 200_000) -> Iterator[pd.DataFrame]:
+        """Stream the window's raw rows in frames that each hold whole sensors.
+
+        Rows come from a server-side cursor ``chunksize`` at a time. Because
+        they are ordered by sensor, the last sensor of each chunk is held back
+        and joined with the next one so no sensor is split across frames.
+        The cursor gets its own connection so inserts can run on the session
+        connection while it is open.
+        """
+        stmt = text(RAW_RANGE_QUERY)
+        carry = None
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql(stmt, conn, params={"start": start, "end": end}, chunksize=chunksize):
+                # An empty window still yields one empty frame
+                if chunk.empty:
+                    continue
+                if carry is not None:
+                    chunk = pd.concat([carry, chunk], ignore_index=True)
+                tail = chunk["sensor_id"].to_numpy() == chunk["sensor_id"].iloc[-1]
+                carry = chunk[tail]
+                ready = chunk[~tail]
+                if not ready.empty:
+                    yield _prepare_raw(ready.reset_index(drop=True))
+        if carry is not None and not carry.empty:
+            yield _prepare_raw(carry.reset_index(drop=True))
 
     def raw_time_bounds(self) -> Tuple[pd.Timestamp, pd.Timestamp] | Tuple[None, None]:
-        with self.engine.begin() as conn:
+        with self._connect() as conn:
             row = conn.execute(sa.text(BOUNDS_QUERY)).first()
         if not row or row.min_ts is None or row.max_ts is None:
             return None, None
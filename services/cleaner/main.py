@@ -16,10 +16,11 @@ logger = logging.getLogger("cleaner")
 def run() -> None:
     cfg = config.load()
     logger.info(
-        "starting cleaner (lookback=%s, dry_run=%s, arima_enabled=%s)",
+        "starting cleaner (lookback=%s, dry_run=%s, arima_enabled=%s, workers=%s)",
         cfg.lookback,
         cfg.dry_run,
         cfg.arima_enabled,
+        cfg.workers,
     )
 
     db = Database(cfg.database_url)
@@ -44,7 +45,7 @@ def run() -> None:
         logger.info("dry-run enabled; skipping insert. preview=%s", preview)
         return
 
-    inserted = db.insert_clean_measurements(cleaned_df.to_dict(orient="records"))
+    inserted = db.insert_clean_measurements(cleaned_df)
     logger.info("inserted %d rows into clean_measurements", inserted)
 
 
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import logging
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import numpy as np
 import pandas as pd
@@ -16,61 +18,40 @@ IMPUTED_FLAG = 2
 POOR_QUALITY_FLAG = 4
 
 
-def _aggregate_10min_windows(sensor_id: str, df: pd.DataFrame) -> pd.DataFrame:
+def _aggregate_10min_windows(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate measurements into 10-minute windows, taking the maximum value.
     
     This reduces data bloat by consolidating multiple measurements within
     each 10-minute period into a single maximum value, which is appropriate
-    for precipitation data where we care about peak intensity.
+    for precipitation data where we care about peak intensity. All sensors
+    are aggregated in a single grouped pass.
     
     Args:
-        sensor_id: The sensor identifier
         df: DataFrame with columns: sensor_id, ts, value_mm, quality (optional)
         
     Returns:
-        Aggregated DataFrame with one row per 10-minute window
+        Aggregated DataFrame with one row per sensor and 10-minute window
+        (columns: sensor_id, ts, value_mm, quality if present)
     """
-    if df.empty:
-        return df
+    # Windows are aligned to midnight, matching resample('10min')
+    windows = pd.to_datetime(df["ts"], utc=True).dt.floor("10min")
     
-    # Ensure ts is datetime
-    df = df.copy()
-    df['ts'] = pd.to_datetime(df['ts'], utc=True)
-    df = df.sort_values('ts')
+    # Take the max value_mm per window; for quality, take the mean (if present)
+    agg_dict = {"value_mm": pd.to_numeric(df["value_mm"], errors="coerce")}
+    if "quality" in df.columns:
+        agg_dict["quality"] = pd.to_numeric(df["quality"], errors="coerce")
+    grouped = pd.DataFrame(agg_dict).groupby([df["sensor_id"], windows], sort=False, observed=True)
     
-    # Set ts as index for resampling
-    df_indexed = df.set_index('ts')
-    
-    # Resample to 10-minute windows, taking max value_mm
-    # For quality, take the mean (if present)
-    agg_dict = {'value_mm': 'max'}
-    if 'quality' in df_indexed.columns:
-        agg_dict['quality'] = 'mean'
-    
-    resampled = df_indexed.resample('10T').agg(agg_dict)
+    aggregated = grouped["value_mm"].max().to_frame()
+    if "quality" in agg_dict:
+        aggregated["quality"] = grouped["quality"].mean()
     
     # Drop windows with no data
-    resampled = resampled.dropna(subset=['value_mm'])
-    
-    if resampled.empty:
-        return pd.DataFrame(columns=['sensor_id', 'ts', 'value_mm', 'quality', 'variable', 'source'])
-    
-    # Reset index to get ts back as column
-    result = resampled.reset_index()
-    result['sensor_id'] = sensor_id
+    aggregated = aggregated.dropna(subset=["value_mm"]).reset_index()
     
-    # Preserve other columns if they exist (use first value in window)
-    if 'variable' in df.columns:
-        result['variable'] = df['variable'].iloc[0]
-    if 'source' in df.columns:
-        result['source'] = df['source'].iloc[0]
+    logger.debug("aggregated %d measurements into %d 10-minute windows", len(df), len(aggregated))
     
-    logger.debug(
-        "sensor %s: aggregated %d measurements into %d 10-minute windows",
-        sensor_id, len(df), len(result)
-    )
-    
-    return result
+    return aggregated
 
 
 def clean_measurements(raw_df: pd.DataFrame, cfg: Config) -> pd.DataFrame:
@@ -78,139 +59,234 @@ def clean_measurements(raw_df: pd.DataFrame, cfg: Config) -> pd.DataFrame:
     
     Aggregates measurements into 10-minute windows, taking the maximum value
     per sensor to reduce data bloat while maintaining temporal resolution.
+    Outlier/quality masking and the final clip run once over all sensors;
+    only imputation, which depends on each sensor's history, runs per sensor.
     """
     if raw_df.empty:
         return pd.DataFrame(columns=["sensor_id", "ts", "value_mm", "qc_flags", "imputation_method", "version"])
 
-    results = []
-    for sensor_id, group in raw_df.groupby("sensor_id"):
-        # First aggregate raw data by 10-minute windows
-        aggregated = _aggregate_10min_windows(sensor_id, group)
-        if aggregated.empty:
-            continue
-        # Then apply cleaning and imputation
-        cleaned = _clean_sensor_dataframe(sensor_id, aggregated, cfg)
-        if not cleaned.empty:
-            results.append(cleaned)
-    if not results:
+    # First aggregate raw data by 10-minute windows
+    aggregated = _aggregate_10min_windows(raw_df)
+    if aggregated.empty:
         return pd.DataFrame(columns=["sensor_id", "ts", "value_mm", "qc_flags", "imputation_method", "version"])
-    return pd.concat(results, ignore_index=True)
 
+    # QC over every window at once: out-of-range and poor-quality values become gaps
+    values = pd.to_numeric(aggregated["value_mm"], errors="coerce").to_numpy(dtype=float)
+    outlier_mask = (values < cfg.min_value_mm) | (values > cfg.max_value_mm)
+    # Flags are a 3-bit mask, so int8 is enough; values stay float64 since
+    # ARIMA and np.interp compute in float64 and the column is DOUBLE PRECISION
+    qc_flags = np.where(outlier_mask, OUTLIER_FLAG, 0).astype(np.int8)
+    values[outlier_mask] = np.nan
+
+    if cfg.min_quality is not None and "quality" in aggregated:
+        quality = pd.to_numeric(aggregated["quality"], errors="coerce").to_numpy(dtype=float)
+        # NaN quality compares False, so unknown quality is kept
+        poor_quality_mask = quality < cfg.min_quality
+        values[poor_quality_mask] = np.nan
+        qc_flags[poor_quality_mask] |= POOR_QUALITY_FLAG
+
+    aggregated["value_mm"] = values
+    aggregated["qc_flags"] = qc_flags
+
+    # Then impute the remaining gaps sensor by sensor; sensors are independent,
+    # so the ARIMA fits can run in separate processes
+    sensor_ids, groups = zip(*aggregated.groupby("sensor_id", sort=False, observed=True))
+    workers = min(cfg.workers, len(groups))
+    if workers > 1:
+        # Ship sensors to workers in batches (~4 per worker) to amortize pickling/IPC
+        chunksize = max(1, len(groups) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            cleaned_groups = list(
+                pool.map(_clean_sensor, sensor_ids, groups, repeat(cfg), chunksize=chunksize)
+            )
+    else:
+        cleaned_groups = list(map(_clean_sensor, sensor_ids, groups, repeat(cfg)))
+
+    # Each sensor yields at most its aggregated rows, so write them straight
+    # into arrays sized for the whole batch instead of concatenating frames
+    total = len(aggregated)
+    rows = np.empty(total, dtype=np.intp)
+    sensor_codes = np.empty(total, dtype=np.intp)
+    clean_values = np.empty(total, dtype=float)
+    clean_flags = np.empty(total, dtype=np.int8)
+    methods = np.empty(total, dtype=np.int8)
+    kept_ids = []
+    offset = 0
+    for sensor_id, (sensor_rows, sensor_values, sensor_flags, sensor_methods) in zip(sensor_ids, cleaned_groups):
+        n = len(sensor_rows)
+        if not n:
+            continue
+        window = slice(offset, offset + n)
+        rows[window] = sensor_rows
+        sensor_codes[window] = len(kept_ids)
+        clean_values[window] = sensor_values
+        clean_flags[window] = sensor_flags
+        methods[window] = sensor_methods
+        kept_ids.append(sensor_id)
+        offset += n
+    if not offset:
+        return pd.DataFrame(columns=["sensor_id", "ts", "value_mm", "qc_flags", "imputation_method", "version"])
 
-def _clean_sensor_dataframe(sensor_id: str, df: pd.DataFrame, cfg: Config) -> pd.DataFrame:
-    df = df.sort_values("ts").reset_index(drop=True)
-    ts_index = pd.to_datetime(df["ts"], utc=True)
+    return pd.DataFrame(
+        {
+            "sensor_id": pd.Categorical.from_codes(sensor_codes[:offset], categories=kept_ids),
+            "ts": aggregated["ts"].array.take(rows[:offset]),
+            "value_mm": np.clip(clean_values[:offset], cfg.min_value_mm, cfg.max_value_mm),
+            "qc_flags": clean_flags[:offset],
+            "imputation_method": pd.Categorical.from_codes(methods[:offset], dtype=IMPUTATION_METHODS),
+            "version": np.ones(offset, dtype=np.int16),
+        },
+        copy=False,
+    )
 
-    values = pd.to_numeric(df["value_mm"], errors="coerce")
-    clean_series = pd.Series(values.to_numpy(dtype=float), index=ts_index, dtype=float)
 
-    qc_flags = np.zeros(len(df), dtype=np.int32)
+# imputation_method is categorical over this fixed label set; the codes
+# below index it, with -1 (_NOT_IMPUTED) for observed values
+IMPUTATION_METHODS = pd.CategoricalDtype(["arima_forecast", "time_interp", "hour_median", "zero_fallback"])
+_NOT_IMPUTED, _ARIMA_FORECAST, _TIME_INTERP, _HOUR_MEDIAN, _ZERO_FALLBACK = range(-1, 4)
 
-    outlier_mask = (clean_series < cfg.min_value_mm) | (clean_series > cfg.max_value_mm)
-    clean_series[outlier_mask] = np.nan
-    qc_flags[outlier_mask.to_numpy()] |= OUTLIER_FLAG
 
-    if cfg.min_quality is not None and "quality" in df:
-        quality = pd.to_numeric(df["quality"], errors="coerce")
-        poor_quality_mask = quality < cfg.min_quality
-        poor_quality_mask = poor_quality_mask.fillna(False)
-        if poor_quality_mask.any():
-            clean_series[poor_quality_mask.to_numpy()] = np.nan
-            qc_flags[poor_quality_mask.to_numpy()] |= POOR_QUALITY_FLAG
+def _fill_remaining_gaps(index: pd.DatetimeIndex, values: np.ndarray, cfg: Config) -> np.ndarray:
+    """Fill NaNs in ``values`` in place with the fallback hierarchy in one pass.
 
-    imputation_method = pd.Series(index=clean_series.index, dtype="object")
+    Each gap takes the first available of: time-weighted interpolation when it
+    lies within ``cfg.interpolation_limit`` samples of an observation, the
+    median of observations from the same hour of day (including interpolated
+    ones), and finally 0 (no precipitation).
 
-    if cfg.arima_enabled:
-        arima_filled, arima_labels = _arima_forecast_fill(clean_series, cfg)
-        newly_filled = clean_series.isna() & arima_filled.notna()
-        clean_series = arima_filled
-        imputation_method.loc[newly_filled] = arima_labels.loc[newly_filled]
+    Returns:
+        Per-position IMPUTATION_METHODS code (_NOT_IMPUTED where nothing was filled)
+    """
+    codes = np.full(len(values), _NOT_IMPUTED, dtype=np.int8)
+    gaps = np.isnan(values)
+    valid = ~gaps
+    positions = np.arange(len(values))
+    gap_positions = positions[gaps]
+
+    if valid.any():
+        valid_positions = positions[valid]
+        ts_ns = index.asi8
+        # Distance (in samples) from each gap to the nearest observation on either side
+        next_slot = np.searchsorted(valid_positions, gap_positions)
+        prev_distance = np.full(len(gap_positions), np.iinfo(np.int64).max)
+        next_distance = np.full(len(gap_positions), np.iinfo(np.int64).max)
+        has_prev = next_slot > 0
+        has_next = next_slot < len(valid_positions)
+        prev_distance[has_prev] = gap_positions[has_prev] - valid_positions[next_slot[has_prev] - 1]
+        next_distance[has_next] = valid_positions[next_slot[has_next]] - gap_positions[has_next]
+        within_limit = np.minimum(prev_distance, next_distance) <= cfg.interpolation_limit
+
+        interp_positions = gap_positions[within_limit]
+        # np.interp holds the edge values beyond the first/last observation
+        values[interp_positions] = np.interp(ts_ns[interp_positions], ts_ns[valid], values[valid])
+        codes[interp_positions] = _TIME_INTERP
+
+    still_missing = np.isnan(values)
+    if still_missing.any() and not still_missing.all():
+        hours = index.hour.to_numpy()
+        base = ~still_missing
+        hourly_medians = np.full(24, np.nan)
+        medians = pd.Series(values[base]).groupby(hours[base]).median()
+        hourly_medians[medians.index.to_numpy()] = medians.to_numpy()
+        hour_fill = hourly_medians[hours]
+        median_positions = np.flatnonzero(still_missing & ~np.isnan(hour_fill))
+        values[median_positions] = hour_fill[median_positions]
+        codes[median_positions] = _HOUR_MEDIAN
+        still_missing = np.isnan(values)
+
+    values[still_missing] = 0.0
+    codes[still_missing] = _ZERO_FALLBACK
+    return codes
+
+
+def _clean_sensor(
+    sensor_id: str, df: pd.DataFrame, cfg: Config
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Impute the gaps left by QC in one sensor's windows.
+
+    Expects ``value_mm`` already QC-masked (NaN for rejected values) and the
+    matching ``qc_flags`` from clean_measurements.
 
-    remaining = clean_series.isna()
-    if remaining.any():
-        interp = clean_series.interpolate(
-            method="time",
-            limit=cfg.interpolation_limit,
-            limit_direction="both",
-        )
-        interp_filled = remaining & interp.notna()
-        if interp_filled.any():
-            clean_series.loc[interp_filled] = interp.loc[interp_filled]
-            imputation_method.loc[interp_filled] = "time_interp"
-        remaining = clean_series.isna()
+    Returns:
+        (rows, value_mm, qc_flags, IMPUTATION_METHODS codes) in time order,
+        where rows are ``df``'s index labels (positions in the aggregated frame)
+    """
+    # ts is already UTC from the aggregation; windows usually arrive in time
+    # order, so only reorder the arrays when they don't (no frame copy)
+    ts_index = pd.DatetimeIndex(df["ts"])
+    order = None if ts_index.is_monotonic_increasing else np.argsort(ts_index.asi8)
+
+    # All fills below are positional writes into these arrays
+    rows = df.index.to_numpy()
+    values = df["value_mm"].to_numpy(dtype=float, copy=True)
+    qc_flags = df["qc_flags"].to_numpy(dtype=np.int8, copy=True)
+    if order is not None:
+        ts_index = ts_index[order]
+        rows = rows[order]
+        values = values[order]
+        qc_flags = qc_flags[order]
+    methods = np.full(len(values), _NOT_IMPUTED, dtype=np.int8)
+
+    # NaN masks are computed once per stage and reused
+    gaps = np.isnan(values)
+    remaining = gaps
+    if cfg.arima_enabled and gaps.any():
+        values = _arima_forecast_fill(values, cfg)
+        remaining = np.isnan(values)
+        methods[gaps & ~remaining] = _ARIMA_FORECAST
 
     if remaining.any():
-        base_series = clean_series.dropna()
-        if not base_series.empty:
-            hourly_medians = base_series.groupby(base_series.index.hour).median()
-            for hour, median in hourly_medians.items():
-                if pd.isna(median):
-                    continue
-                hour_mask = remaining & (clean_series.index.hour == hour)
-                if hour_mask.any():
-                    clean_series.loc[hour_mask] = median
-                    imputation_method.loc[hour_mask] = "hour_median"
-            remaining = clean_series.isna()
-        else:
+        if remaining.all():
             logger.debug("sensor %s: no base data for hourly medians", sensor_id)
+        codes = _fill_remaining_gaps(ts_index, values, cfg)
+        zero_filled = int((codes == _ZERO_FALLBACK).sum())
+        if zero_filled:
+            # Final fallback: use 0 (no precipitation)
+            logger.debug("sensor %s: using fallback %.3f for %d gaps", sensor_id, 0.0, zero_filled)
+        filled = codes != _NOT_IMPUTED
+        methods[filled] = codes[filled]
 
-    if remaining.any():
-        # Final fallback: use 0 (no precipitation)
-        fallback = 0.0
-        logger.debug(
-            "sensor %s: using fallback %.3f for %d gaps",
-            sensor_id,
-            fallback,
-            remaining.sum(),
-        )
-        clean_series.loc[remaining] = fallback
-        imputation_method.loc[remaining] = "zero_fallback"
-
-    clean_series = clean_series.clip(lower=cfg.min_value_mm, upper=cfg.max_value_mm)
-
-    imputed_mask = imputation_method.notna()
-    qc_flags[imputed_mask.to_numpy()] |= IMPUTED_FLAG
-
-    valid_mask = ~clean_series.isna()
-    if not valid_mask.any():
-        return pd.DataFrame(columns=["sensor_id", "ts", "value_mm", "qc_flags", "imputation_method", "version"])
+    qc_flags[methods != _NOT_IMPUTED] |= IMPUTED_FLAG
 
-    qc_flags_series = pd.Series(qc_flags, index=clean_series.index)
-    imputation_method = imputation_method.where(imputation_method.notna(), None)
+    keep = np.flatnonzero(~np.isnan(values))
+    return rows[keep], values[keep], qc_flags[keep], methods[keep]
 
-    result = pd.DataFrame(
-        {
-            "sensor_id": sensor_id,
-            "ts": clean_series.index,
-            "value_mm": clean_series.values,
-            "qc_flags": qc_flags_series.values,
-            "imputation_method": imputation_method.values,
-            "version": 1,
-        }
-    )
 
-    result = result[valid_mask.values].reset_index(drop=True)
-    return result
+def _arima_forecast_fill(values: np.ndarray, cfg: Config) -> np.ndarray:
+    """Fill missing values using ARIMA forecasting.
 
+    Returns a copy of ``values`` with the forecastable gaps filled, or
+    ``values`` itself when there is nothing to fill.
+    """
+    values = np.asarray(values, dtype=float)
 
-def _arima_forecast_fill(series: pd.Series, cfg: Config) -> tuple[pd.Series, pd.Series]:
-    """Fill missing values using ARIMA forecasting."""
-    filled = series.copy().astype(float)
-    labels = pd.Series(index=series.index, dtype="object")
+    # No gaps: nothing to fit or copy
+    gap_mask = np.isnan(values)
+    if not gap_mask.any():
+        return values
 
     # Need sufficient training data
-    train_mask = filled.notna()
-    if train_mask.sum() < cfg.arima_min_train:
-        logger.debug("Insufficient data for ARIMA (%d < %d)", train_mask.sum(), cfg.arima_min_train)
-        return filled, labels
-
-    # Get indices of gaps to fill
-    gap_mask = filled.isna()
-    if not gap_mask.any():
-        return filled, labels
+    train_count = len(values) - int(gap_mask.sum())
+    if train_count < cfg.arima_min_train:
+        logger.debug("Insufficient data for ARIMA (%d < %d)", train_count, cfg.arima_min_train)
+        return values
+
+    # Only gaps after the last observation can be forecast, and each is
+    # measured from that same observation. Skip the fit when none qualify.
+    gap_positions = np.flatnonzero(gap_mask)
+    last_valid_pos = np.flatnonzero(~gap_mask)[-1]
+    steps = gap_positions - last_valid_pos
+    # Can't forecast backwards, and don't forecast too far ahead
+    forecastable = (steps > 0) & (steps <= 100)
+    if not forecastable.any():
+        logger.debug("No gaps within the ARIMA forecast horizon")
+        return values
+    gap_positions = gap_positions[forecastable]
+    steps = steps[forecastable]
 
     # Train ARIMA model on available data
-    train_data = filled.dropna()
+    train_data = values[~gap_mask]
+    filled = values.copy()
     
     try:
         # Suppress statsmodels warnings
@@ -222,7 +298,7 @@ def _arima_forecast_fill(series: pd.Series, cfg: Config) -> tuple[pd.Series, pd.
             if cfg.arima_seasonal and len(train_data) >= cfg.arima_m * 2:
                 # SARIMA model
                 model = ARIMA(
-                    train_data.values,
+                    train_data,
                     order=(1, 1, 1),
                     seasonal_order=(1, 1, 1, cfg.arima_m),
                     enforce_stationarity=False,
@@ -231,49 +307,23 @@ def _arima_forecast_fill(series: pd.Series, cfg: Config) -> tuple[pd.Series, pd.
             else:
                 # Simple ARIMA model
                 model = ARIMA(
-                    train_data.values,
+                    train_data,
                     order=(cfg.arima_max_order, 1, cfg.arima_max_order),
                     enforce_stationarity=False,
                     enforce_invertibility=False,
                 )
             
-            fitted_model = model.fit()
+            # Only point forecasts are used: skip the parameter covariance and
+            # smoothed-state storage, which dominate fit time and memory
+            fitted_model = model.fit(cov_type="none", low_memory=True)
         
-        # Fill gaps by forecasting
-        filled_count = 0
-        for idx in series.index[gap_mask]:
-            # Find position in the series
-            pos = series.index.get_loc(idx)
-            
-            # Determine how many steps ahead to forecast
-            last_valid_idx = series.index[train_mask][-1]
-            last_valid_pos = series.index.get_loc(last_valid_idx)
-            steps = pos - last_valid_pos
-            
-            if steps <= 0:
-                continue  # Can't forecast backwards
-            
-            if steps > 100:  # Don't forecast too far ahead
-                continue
-            
-            try:
-                # Make forecast
-                forecast = fitted_model.forecast(steps=steps)
-                pred_value = float(forecast.iloc[-1] if hasattr(forecast, 'iloc') else forecast[-1])
-                
-                # Clip to valid range
-                pred_value = float(np.clip(pred_value, cfg.min_value_mm, cfg.max_value_mm))
-                
-                filled.loc[idx] = pred_value
-                labels.loc[idx] = "arima_forecast"
-                filled_count += 1
-            except Exception as e:
-                logger.debug("Failed to forecast for position %d: %s", pos, str(e))
-                continue
-            
-        logger.debug("ARIMA filled %d gaps", filled_count)
+        # Fill gaps by forecasting; one forecast over the furthest horizon covers them all
+        forecast = np.asarray(fitted_model.forecast(steps=int(steps.max())), dtype=float)
+        filled[gap_positions] = np.clip(forecast[steps - 1], cfg.min_value_mm, cfg.max_value_mm)
+        
+        logger.debug("ARIMA filled %d gaps", len(gap_positions))
         
     except Exception as e:
         logger.warning("ARIMA forecasting failed: %s", str(e))
     
-    return filled, labels
+    return filled
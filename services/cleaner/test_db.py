@@ -0,0 +1,60 @@
+"""
+Test streaming raw windows with iter_raw_range
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.pool import StaticPool
+
+from services.cleaner.db import Database
+
+
+def _database(rows):
+    """Database backed by in-memory SQLite with a ``shizuku`` schema."""
+    engine = sa.create_engine("sqlite://", poolclass=StaticPool, future=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ':memory:' AS shizuku")
+        conn.exec_driver_sql(
+            "CREATE TABLE shizuku.raw_measurements "
+            "(sensor_id TEXT, ts TEXT, value_mm REAL, quality REAL, variable TEXT, source TEXT)"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE shizuku.clean_measurements (id INTEGER, sensor_id TEXT, ts TEXT, version INTEGER)"
+        )
+        conn.execute(
+            sa.text(
+                "INSERT INTO shizuku.raw_measurements "
+                "VALUES (:sensor_id, :ts, :value_mm, 1.0, 'precipitacion', 'test')"
+            ),
+            rows,
+        )
+    db = Database.__new__(Database)
+    db.engine = engine
+    db._session_conn = None
+    return db
+
+
+def _rows(sensor_id, count):
+    return [
+        {"sensor_id": sensor_id, "ts": f"2025-10-01 {hour:02d}:00:00+00:00", "value_mm": float(hour)}
+        for hour in range(count)
+    ]
+
+
+def test_empty_window_yields_nothing():
+    db = _database(_rows("s1", 3))
+    frames = list(db.iter_raw_range("2025-11-01", "2025-11-02", chunksize=2))
+    assert frames == []
+
+
+def test_sensor_spanning_chunks_stays_whole():
+    db = _database(_rows("s1", 5) + _rows("s2", 2))
+    frames = list(db.iter_raw_range("2025-10-01", "2025-10-02", chunksize=2))
+
+    assert [sorted(frame["sensor_id"].unique()) for frame in frames] == [["s1"], ["s2"]]
+    assert [len(frame) for frame in frames] == [5, 2]
+    combined = pd.concat(frames, ignore_index=True)
+    assert combined["ts"].dt.tz is not None
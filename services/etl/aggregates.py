@@ -14,7 +14,7 @@ Aggregates include:
 from __future__ import annotations
 
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import pandas as pd
 
@@ -44,6 +44,25 @@ def calculate_avg_mm_h(values: pd.Series, interval_hours: float) -> float:
     return float(avg_mm_h)
 
 
+def _aggregate_frame(measurements_df: pd.DataFrame, interval: pd.Timedelta) -> pd.DataFrame:
+    """
+    Aggregate every sensor in one grouped pass.
+    
+    Returns:
+        DataFrame with one row per sensor and the aggregate columns
+    """
+    interval_hours = interval.total_seconds() / 3600
+    
+    agg = (
+        measurements_df.groupby('sensor_id', sort=False, observed=True)['value_mm']
+        .agg(avg_mm='mean', measurement_count='size', min_value_mm='min', max_value_mm='max')
+        .reset_index()
+    )
+    # Convert the period's average accumulation to a rate: mm/hour
+    agg['avg_mm_h'] = agg['avg_mm'] / interval_hours if interval_hours else 0.0
+    return agg[['sensor_id', 'avg_mm_h', 'measurement_count', 'min_value_mm', 'max_value_mm']]
+
+
 def aggregate_sensor_data(
     measurements_df: pd.DataFrame,
     interval: pd.Timedelta
@@ -62,29 +81,7 @@ def aggregate_sensor_data(
         logger.warning("No measurements provided for aggregation")
         return []
     
-    interval_hours = interval.total_seconds() / 3600
-    
-    aggregates = []
-    
-    # Group by sensor and calculate aggregates
-    for sensor_id, sensor_data in measurements_df.groupby('sensor_id'):
-        if len(sensor_data) == 0:
-            continue
-            
-        values = sensor_data['value_mm']
-        
-        # Calculate average rate
-        avg_mm_h = calculate_avg_mm_h(values, interval_hours)
-        
-        aggregate = {
-            'sensor_id': sensor_id,
-            'avg_mm_h': avg_mm_h,
-            'measurement_count': len(sensor_data),
-            'min_value_mm': float(values.min()),
-            'max_value_mm': float(values.max()),
-        }
-        
-        aggregates.append(aggregate)
+    aggregates = _aggregate_frame(measurements_df, interval).to_dict(orient='records')
     
     logger.info("Calculated aggregates for %d sensors", len(aggregates))
     
@@ -130,7 +127,8 @@ def validate_aggregate(aggregate: Dict) -> bool:
 def calculate_grid_sensor_aggregates(
     snapshot_df: pd.DataFrame,
     ts_start: pd.Timestamp,
-    ts_end: pd.Timestamp
+    ts_end: pd.Timestamp,
+    grid_run_id: Optional[int] = None,
 ) -> List[Dict]:
     """
     Calculate sensor aggregates for a grid period.
@@ -141,6 +139,7 @@ def calculate_grid_sensor_aggregates(
         snapshot_df: DataFrame with sensor measurements [sensor_id, ts, value_mm]
         ts_start: Start of the grid period
         ts_end: End of the grid period
+        grid_run_id: Grid run to stamp on every aggregate, if given
         
     Returns:
         List of aggregate dictionaries ready for database insertion
@@ -152,20 +151,24 @@ def calculate_grid_sensor_aggregates(
     interval = ts_end - ts_start
     
     # Calculate aggregates
-    aggregates = aggregate_sensor_data(snapshot_df, interval)
-    
-    # Add timestamp information
-    for aggregate in aggregates:
-        aggregate['ts_start'] = ts_start
-        aggregate['ts_end'] = ts_end
-    
-    # Validate all aggregates
-    valid_aggregates = [agg for agg in aggregates if validate_aggregate(agg)]
-    
-    if len(valid_aggregates) < len(aggregates):
-        logger.warning(
-            "Filtered out %d invalid aggregates",
-            len(aggregates) - len(valid_aggregates)
-        )
-    
-    return valid_aggregates
+    agg = _aggregate_frame(snapshot_df, interval)
+    logger.info("Calculated aggregates for %d sensors", len(agg))
+    
+    # Validate all aggregates at once (same rules as validate_aggregate)
+    invalid = (
+        (agg['avg_mm_h'] < 0)
+        | (agg['measurement_count'] <= 0)
+        | (agg['min_value_mm'] > agg['max_value_mm'])
+    )
+    if invalid.any():
+        for aggregate in agg[invalid].to_dict(orient='records'):
+            validate_aggregate(aggregate)  # logs the reason
+        logger.warning("Filtered out %d invalid aggregates", int(invalid.sum()))
+        agg = agg[~invalid]
+    
+    # Add timestamp (and run) information as broadcast columns
+    agg = agg.assign(ts_start=ts_start, ts_end=ts_end)
+    if grid_run_id is not None:
+        agg['grid_run_id'] = grid_run_id
+    
+    return agg.to_dict(orient='records')
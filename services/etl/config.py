@@ -4,12 +4,13 @@ import os
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 from dotenv import load_dotenv
 
 
-def _get_database_url() -> str:
+def _get_database_url(env: Mapping[str, str]) -> str:
     """Get database URL with support for Heroku's dynamic env variable names.
     
     Reads DB_ENV_VARIABLE to get the actual env variable name containing the database URL.
@@ -17,8 +18,8 @@ def _get_database_url() -> str:
     Also fixes postgres:// to postgresql:// for Python compatibility.
     """
     # First check if we have an indirection variable
-    db_env_var_name = os.getenv("DB_ENV_VARIABLE", "DATABASE_URL")
-    database_url = os.getenv(db_env_var_name)
+    db_env_var_name = env.get("DB_ENV_VARIABLE", "DATABASE_URL")
+    database_url = env.get(db_env_var_name)
     
     if not database_url:
         raise RuntimeError(f"{db_env_var_name} is required for ETL service (specified by DB_ENV_VARIABLE={db_env_var_name})")
@@ -30,7 +31,7 @@ def _get_database_url() -> str:
     return database_url
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True)
 class Config:
     database_url: str
     blob_token: str
@@ -41,6 +42,8 @@ class Config:
     max_slots_per_run: int
     backfill_hours: int
     dry_run: bool
+    workers: int = 1
+    blob_timeout_s: int = 10
 
 
 def _parse_int(value: Optional[str], default: int) -> int:
@@ -57,23 +60,27 @@ def _parse_bool(value: Optional[str], default: bool = False) -> bool:
 
 def load() -> Config:
     load_dotenv(Path(".env"), override=False)
+    # Read-only snapshot so every setting comes from the same environment view
+    env = MappingProxyType(dict(os.environ))
 
-    database_url = _get_database_url()
+    database_url = _get_database_url(env)
 
-    blob_token = os.getenv("VERCEL_BLOB_RW_TOKEN")
+    blob_token = env.get("VERCEL_BLOB_RW_TOKEN")
     if not blob_token:
         raise RuntimeError("VERCEL_BLOB_RW_TOKEN is required for ETL service")
 
-    blob_base_url = os.getenv("VERCEL_BLOB_BASE_URL")
+    blob_base_url = env.get("VERCEL_BLOB_BASE_URL")
     if not blob_base_url:
         raise RuntimeError("VERCEL_BLOB_BASE_URL must be set (e.g. https://...vercel-storage.com)")
 
-    interval_min = _parse_int(os.getenv("GRID_INTERVAL_MIN"), default=60)
-    grid_resolution = _parse_int(os.getenv("GRID_RESOLUTION_M"), default=500)
-    padding = _parse_int(os.getenv("GRID_PADDING_M"), default=2000)
-    max_slots = _parse_int(os.getenv("ETL_MAX_SLOTS"), default=3)
-    backfill_hours = _parse_int(os.getenv("ETL_BACKFILL_HOURS"), default=48)
-    dry_run = _parse_bool(os.getenv("DRY_RUN"), default=False)
+    interval_min = _parse_int(env.get("GRID_INTERVAL_MIN"), default=60)
+    grid_resolution = _parse_int(env.get("GRID_RESOLUTION_M"), default=500)
+    padding = _parse_int(env.get("GRID_PADDING_M"), default=2000)
+    max_slots = _parse_int(env.get("ETL_MAX_SLOTS"), default=3)
+    backfill_hours = _parse_int(env.get("ETL_BACKFILL_HOURS"), default=48)
+    dry_run = _parse_bool(env.get("DRY_RUN"), default=False)
+    workers = max(1, _parse_int(env.get("ETL_WORKERS"), default=max_slots))
+    blob_timeout_s = max(1, _parse_int(env.get("ETL_BLOB_TIMEOUT_S"), default=10))
 
     return Config(
         database_url=database_url,
@@ -85,4 +92,6 @@ def load() -> Config:
         max_slots_per_run=max_slots,
         backfill_hours=backfill_hours,
         dry_run=dry_run,
+        workers=workers,
+        blob_timeout_s=blob_timeout_s,
     )
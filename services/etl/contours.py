@@ -1,45 +1,69 @@
 from __future__ import annotations
 
-import matplotlib
-matplotlib.use("Agg")
-
-import json
+from functools import lru_cache
 from typing import List, Dict
 
-import matplotlib.pyplot as plt
+import contourpy
+import numpy as np
+import orjson
 from pyproj import Transformer
 
 
+@lru_cache(maxsize=4)
+def _transformer(src_crs: str, dst_crs: str) -> Transformer:
+    """Build (once per CRS pair) the PROJ transformer; construction dominates small grids."""
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
 def generate_contours_geojson(x_grid, y_grid, data_grid, thresholds: List[Dict]):
     if not thresholds:
         geojson = {"type": "FeatureCollection", "features": []}
-        return json.dumps(geojson, separators=(",", ":")).encode("utf-8")
+        return orjson.dumps(geojson)
 
     levels = [t["value"] for t in thresholds]
-    transformer = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
-    fig, ax = plt.subplots()
-    try:
-        contour_set = ax.contour(x_grid, y_grid, data_grid, levels=levels)
-        features = []
-        for threshold, segments in zip(thresholds, contour_set.allsegs):
-            for seg in segments:
-                if len(seg) < 2:
-                    continue
-                lon, lat = transformer.transform(seg[:, 0], seg[:, 1])
-                coords = [[float(lon_val), float(lat_val)] for lon_val, lat_val in zip(lon, lat)]
-                features.append(
-                    {
-                        "type": "Feature",
-                        "properties": {
-                            "threshold_mm": float(threshold["value"]),
-                            "category": threshold["category"],
-                            "next_category": threshold["next_category"],
-                        },
-                        "geometry": {"type": "LineString", "coordinates": coords},
-                    }
-                )
-    finally:
-        plt.close(fig)
+    transformer = _transformer("EPSG:3857", "EPSG:4326")
+    # contourpy is the marching-squares engine behind matplotlib's contour();
+    # calling it directly avoids building a Figure/Axes per grid. "serial"
+    # traces the same lines as matplotlib's default mpl2014, only faster
+    generator = contourpy.contour_generator(
+        x_grid,
+        y_grid,
+        np.ma.masked_invalid(data_grid),
+        name="serial",
+        corner_mask=True,
+        line_type=contourpy.LineType.Separate,
+    )
+    segment_thresholds = []
+    segments = []
+    for threshold, level in zip(thresholds, levels):
+        for seg in generator.lines(level):
+            if len(seg) < 2:
+                continue
+            segment_thresholds.append(threshold)
+            segments.append(seg)
+
+    features = []
+    if segments:
+        # Reproject every vertex in one in-place PROJ call on contiguous
+        # float64 buffers (no copies), then split back per segment; the row
+        # slices stay ndarrays, which orjson serializes natively
+        lon = np.concatenate([seg[:, 0] for seg in segments])
+        lat = np.concatenate([seg[:, 1] for seg in segments])
+        transformer.transform(lon, lat, inplace=True)
+        coords_flat = np.column_stack((lon, lat))
+        offsets = np.cumsum([0] + [len(seg) for seg in segments]).tolist()
+        for threshold, start, stop in zip(segment_thresholds, offsets[:-1], offsets[1:]):
+            features.append(
+                {
+                    "type": "Feature",
+                    "properties": {
+                        "threshold_mm": float(threshold["value"]),
+                        "category": threshold["category"],
+                        "next_category": threshold["next_category"],
+                    },
+                    "geometry": {"type": "LineString", "coordinates": coords_flat[start:stop]},
+                }
+            )
 
     geojson = {"type": "FeatureCollection", "features": features}
-    return json.dumps(geojson, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(geojson, option=orjson.OPT_SERIALIZE_NUMPY)
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import io
 from datetime import timedelta
 from typing import Dict, List, Tuple
 
 import pandas as pd
 import sqlalchemy as sa
+from psycopg2.extras import execute_values
 
 from .config import Config
 
@@ -47,14 +49,12 @@ UPDATE_STATUS_SQL = sa.text(
     """
 )
 
-INSERT_AGGREGATES_SQL = sa.text(
-    """
+# psycopg2 placeholders: expanded by execute_values into one multi-row VALUES
+INSERT_AGGREGATES_SQL = """
     INSERT INTO shizuku.grid_sensor_aggregates 
         (grid_run_id, sensor_id, ts_start, ts_end, avg_mm_h, 
          measurement_count, min_value_mm, max_value_mm)
-    VALUES 
-        (:grid_run_id, :sensor_id, :ts_start, :ts_end, :avg_mm_h,
-         :measurement_count, :min_value_mm, :max_value_mm)
+    VALUES %s
     ON CONFLICT (grid_run_id, sensor_id) 
     DO UPDATE SET
         avg_mm_h = EXCLUDED.avg_mm_h,
@@ -62,7 +62,11 @@ INSERT_AGGREGATES_SQL = sa.text(
         min_value_mm = EXCLUDED.min_value_mm,
         max_value_mm = EXCLUDED.max_value_mm,
         updated_at = NOW()
-    """
+"""
+
+INSERT_AGGREGATES_TEMPLATE = (
+    "(%(grid_run_id)s, %(sensor_id)s, %(ts_start)s, %(ts_end)s, %(avg_mm_h)s,"
+    " %(measurement_count)s, %(min_value_mm)s, %(max_value_mm)s)"
 )
 
 FAIL_STATUS_SQL = sa.text(
@@ -73,27 +77,46 @@ FAIL_STATUS_SQL = sa.text(
     """
 )
 
-SNAPSHOT_QUERY = sa.text(
-    """
-    SELECT cm.sensor_id,
+# Every pending slot's snapshot in one round-trip; a row belongs to each slot
+# whose [slot, slot + interval) window contains it. psycopg2 placeholders:
+# the query is inlined with mogrify and streamed back with COPY ... TO STDOUT
+SNAPSHOTS_QUERY = """
+    SELECT slots.slot,
+           cm.sensor_id,
            cm.ts,
            cm.value_mm,
            cm.imputation_method,
            s.lat,
            s.lon
-    FROM shizuku.clean_measurements cm
+    FROM unnest(%(starts)s::timestamptz[]) AS slots(slot)
+    JOIN shizuku.clean_measurements cm
+      ON cm.ts >= slots.slot AND cm.ts < slots.slot + %(interval)s::interval
     JOIN shizuku.sensors s ON s.id = cm.sensor_id
-    WHERE cm.ts >= :start AND cm.ts < :end
-    ORDER BY cm.sensor_id
-    """
-)
+    ORDER BY slots.slot, cm.sensor_id
+"""
+
+SNAPSHOT_COLUMNS = ["slot", "sensor_id", "ts", "value_mm", "imputation_method", "lat", "lon"]
 
 
 class Database:
     def __init__(self, cfg: Config):
-        self.engine = sa.create_engine(cfg.database_url, pool_pre_ping=True, future=True)
+        # Slot workers each hold one connection at a time
+        self.engine = sa.create_engine(
+            cfg.database_url,
+            pool_pre_ping=True,
+            pool_size=max(5, cfg.workers),
+            future=True,
+        )
         self.cfg = cfg
 
+    def _autocommit(self):
+        """Connection for single-statement writes.
+
+        A lone UPDATE is atomic by itself, so skipping BEGIN/COMMIT saves two
+        of the three round-trips engine.begin() would spend on it.
+        """
+        return self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
     def ensure_slots(self) -> None:
         with self.engine.begin() as conn:
             conn.execute(
@@ -122,17 +145,46 @@ class Database:
             result.append((row.id, ts))
         return result
 
-    def load_snapshot(self, slot: pd.Timestamp) -> pd.DataFrame:
-        start = slot
-        end = slot + self.cfg.grid_interval
+    def load_snapshots(self, slots: List[pd.Timestamp]) -> Dict[pd.Timestamp, pd.DataFrame]:
+        """Load the snapshots of several slots with one query.
+
+        Each slot's frame holds the clean measurements in
+        [slot, slot + grid_interval) joined with their sensor's lat/lon,
+        ordered by sensor, with ``ts`` in UTC and ``sensor_id`` categorical
+        (grouped by sensor for the aggregates: hash integer codes, not
+        strings). Slots without rows map to an empty frame.
+
+        The rows come back as a COPY CSV stream parsed by read_csv, which
+        skips building a Python tuple per row in the driver.
+        """
+        buffer = io.BytesIO()
         with self.engine.begin() as conn:
-            df = pd.read_sql(
-                SNAPSHOT_QUERY,
-                conn,
-                params={"start": start, "end": end},
-            )
-        df["ts"] = pd.to_datetime(df["ts"], utc=True)
-        return df
+            # COPY needs the psycopg2 cursor
+            with conn.connection.cursor() as cur:
+                query = cur.mogrify(
+                    SNAPSHOTS_QUERY,
+                    {
+                        "starts": [slot.to_pydatetime() for slot in slots],
+                        "interval": self.cfg.grid_interval,
+                    },
+                ).decode()
+                cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", buffer)
+        buffer.seek(0)
+        df = pd.read_csv(
+            buffer,
+            names=SNAPSHOT_COLUMNS,
+            dtype={"sensor_id": "category", "imputation_method": "object"},
+        )
+        # timestamptz text carries the session's offset; normalise to UTC
+        df["slot"] = pd.to_datetime(df["slot"], utc=True, format="ISO8601")
+        df["ts"] = pd.to_datetime(df["ts"], utc=True, format="ISO8601")
+
+        snapshots = {
+            slot: group.drop(columns="slot").reset_index(drop=True)
+            for slot, group in df.groupby("slot", sort=False)
+        }
+        empty = df.drop(columns="slot").iloc[0:0]
+        return {slot: snapshots.get(slot, empty) for slot in slots}
 
     def mark_success(
         self,
@@ -142,7 +194,7 @@ class Database:
         contours_url: str,
         message: str | None = None,
     ) -> None:
-        with self.engine.begin() as conn:
+        with self._autocommit() as conn:
             conn.execute(
                 UPDATE_STATUS_SQL,
                 {
@@ -169,11 +221,18 @@ class Database:
             return 0
             
         with self.engine.begin() as conn:
-            for agg in aggregates:
-                conn.execute(INSERT_AGGREGATES_SQL, agg)
+            # One multi-row INSERT per page instead of a round-trip per sensor
+            with conn.connection.cursor() as cur:
+                execute_values(
+                    cur,
+                    INSERT_AGGREGATES_SQL,
+                    aggregates,
+                    template=INSERT_AGGREGATES_TEMPLATE,
+                    page_size=1000,
+                )
         
         return len(aggregates)
 
     def mark_failure(self, run_id: int, message: str) -> None:
-        with self.engine.begin() as conn:
+        with self._autocommit() as conn:
             conn.execute(FAIL_STATUS_SQL, {"id": run_id, "message": message[:1000]})
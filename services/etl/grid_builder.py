@@ -1,20 +1,18 @@
 from __future__ import annotations
 
-import json
 import copy
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Tuple, Optional
 
 import numpy as np
 from pyproj import Transformer
-from scipy.signal import convolve2d
 from scipy.interpolate import griddata
+from scipy.spatial import cKDTree
 
 import logging
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend suitable for headless servers
-from matplotlib import cm, colors
-import matplotlib.pyplot as plt
+from matplotlib import colormaps, colors
+from PIL import Image
 from io import BytesIO
 
 @dataclass(slots=True)
@@ -24,13 +22,17 @@ class GridArtifacts:
     y_coords: np.ndarray
     bbox_3857: Tuple[float, float, float, float]
     bbox_wgs84: Tuple[float, float, float, float]
-    metadata_json: str
     levels: np.ndarray
     thresholds: List[dict]
     intensity_classes: List[dict]
     jpeg_bytes: Optional[bytes]
+    timestamp: str
+    metadata: dict
 
 
+# Long side of the JPEG preview, in pixels (the grid is scaled up by whole cells)
+PREVIEW_MAX_PX = 1000
+
 INTENSITY_CLASSES = [
     {"label": "Trace", "min_mm": 0.0, "max_mm": 0.2, "description": "Trace precipitation (≤0.2 mm)"},
     {"label": "Light", "min_mm": 0.2, "max_mm": 2.5, "description": "Light precipitation (0.2–2.5 mm)"},
@@ -40,6 +42,30 @@ INTENSITY_CLASSES = [
 ]
 
 
+@lru_cache(maxsize=8)
+def _grid_geometry(
+    min_x: float, min_y: float, max_x: float, max_y: float, res_m: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Grid axes and flattened (x, y) cell coordinates for a padded bbox.
+
+    The bbox only changes when the reporting sensor set does, so consecutive
+    slots reuse the same arrays; they are shared, hence read-only.
+    """
+    nx = int(np.ceil((max_x - min_x) / res_m)) + 1
+    ny = int(np.ceil((max_y - min_y) / res_m)) + 1
+
+    x_grid = np.linspace(min_x, max_x, nx)
+    y_grid = np.linspace(min_y, max_y, ny)
+
+    # Create meshgrid in EPSG:3857 (x_grid, y_grid are in metres)
+    xx, yy = np.meshgrid(x_grid, y_grid)
+    grid_points = np.column_stack((xx.ravel(), yy.ravel()))
+
+    for array in (x_grid, y_grid, grid_points):
+        array.setflags(write=False)
+    return x_grid, y_grid, grid_points
+
+
 class GridBuilder:
     def __init__(self, res_m: int, padding_m: int):
         self.res_m = res_m
@@ -59,46 +85,25 @@ class GridBuilder:
         min_y = snapshot_df["y"].min() - self.padding_m
         max_y = snapshot_df["y"].max() + self.padding_m
 
-        nx = int(np.ceil((max_x - min_x) / self.res_m)) + 1
-        ny = int(np.ceil((max_y - min_y) / self.res_m)) + 1
-
-        x_grid = np.linspace(min_x, max_x, nx)
-        y_grid = np.linspace(min_y, max_y, ny)
-
-        seed_grid = np.full((ny, nx), np.nan, dtype=float)
-        mask = np.zeros_like(seed_grid, dtype=bool)
-
-        sensor_values = snapshot_df["value_mm"].to_numpy(dtype=float)
-        xi = ((snapshot_df["x"] - min_x) / self.res_m).round().astype(int)
-        yi = ((snapshot_df["y"] - min_y) / self.res_m).round().astype(int)
-
-        for value, gx_raw, gy_raw in zip(sensor_values, xi, yi):
-            gx = np.clip(gx_raw, 0, nx - 1)
-            gy = np.clip(gy_raw, 0, ny - 1)
-            if mask[gy, gx]:
-                seed_grid[gy, gx] = np.nanmean([seed_grid[gy, gx], value])
-            else:
-                seed_grid[gy, gx] = value
-                mask[gy, gx] = True
-
-        # Create meshgrid in EPSG:3857 (x_grid, y_grid are in metres)
-        xx, yy = np.meshgrid(x_grid, y_grid)
+        x_grid, y_grid, grid_points = _grid_geometry(
+            float(min_x), float(min_y), float(max_x), float(max_y), self.res_m
+        )
 
         # Prepare points for interpolation (sensor coordinates in 3857)
         points = np.column_stack((snapshot_df["x"].to_numpy(), snapshot_df["y"].to_numpy()))
         values = snapshot_df["value_mm"].to_numpy(dtype=float)
 
-        grid_points = np.column_stack((xx.ravel(), yy.ravel()))
-
         # First attempt cubic (smooth quadratic-like) interpolation
         quad_flat = griddata(points, values, grid_points, method="cubic")
 
-        # Fill any remaining gaps from cubic with nearest neighbour interpolation
-        if np.any(np.isnan(quad_flat)):
-            nearest_flat = griddata(points, values, grid_points, method="nearest")
-            quad_flat[np.isnan(quad_flat)] = nearest_flat[np.isnan(quad_flat)]
+        # Fill any remaining gaps from cubic with nearest neighbour interpolation,
+        # querying only the gap cells (griddata "nearest" would query every cell)
+        missing = np.isnan(quad_flat)
+        if missing.any():
+            _, nearest = cKDTree(points).query(grid_points[missing])
+            quad_flat[missing] = values[nearest]
 
-        quad_grid = quad_flat.reshape(xx.shape)
+        quad_grid = quad_flat.reshape(len(y_grid), len(x_grid))
 
         bbox_3857 = (float(min_x), float(min_y), float(max_x), float(max_y))
         west, south = self.to_wgs84.transform(min_x, min_y)
@@ -134,47 +139,21 @@ class GridBuilder:
             "intensity_thresholds": thresholds,
         }
 
+        # Value range, reduced once for the fallback levels and the preview colour
+        # scale; fmin/fmax skip NaNs like nanmin/nanmax (NaN only if all-NaN)
+        vmin = float(np.fmin.reduce(quad_grid, axis=None))
+        vmax = float(np.fmax.reduce(quad_grid, axis=None))
+
         if thresholds:
             levels = np.array([t["value"] for t in thresholds], dtype=float)
         else:
-            levels = np.linspace(
-                float(np.nanmin(quad_grid)),
-                float(np.nanmax(quad_grid)),
-                12,
-            )
+            levels = np.linspace(vmin, vmax, 12)
 
-        # Also produce a compressed JPEG (RGB) for quick preview/storage. Convert colormap result
-        # to RGB and encode as JPEG with reasonable quality to save space.
+        # Also produce a compressed JPEG (RGB) for quick preview/storage.
         try:
-            # Render a matplotlib figure (pcolormesh + contours + colorbar) similarly to the
-            # interactive notebook so the preview JPEG resembles the plotted output.
-            fig, ax = plt.subplots(figsize=(10, 6))
-
-            # pcolormesh expects x, y to be 1D grid coordinates
-            mesh = ax.pcolormesh(x_grid, y_grid, quad_grid, cmap="viridis", shading="auto")
-            # draw contour lines using computed levels (if available)
-            try:
-                contours = ax.contour(x_grid, y_grid, quad_grid, levels=levels, colors="white", linewidths=0.7)
-                ax.clabel(contours, inline=True, fontsize=8, fmt="%.1f")
-            except Exception:
-                # If contouring fails for any reason, continue without labels
-                pass
-
-            ax.set_title("Quadratic Interpolated Grid (EPSG:3857)")
-            ax.set_xlabel("x (m)")
-            ax.set_ylabel("y (m)")
-
-            # Add a colorbar to the figure
-            fig.colorbar(mesh, ax=ax, label="Precipitation (mm)")
-            plt.tight_layout()
-
-            buf = BytesIO()
-            # Save as JPEG using matplotlib's savefig (Pillow backend handles quality)
-            fig.savefig(buf, format="jpeg", quality=70, optimize=True)
-            jpeg_bytes = buf.getvalue()
-            plt.close(fig)
+            jpeg_bytes = self._render_preview(quad_grid, levels, vmin, vmax)
         except Exception as exc:
-            # Log the exception so we can diagnose why JPEG generation failed (missing Pillow, backend issues, etc.)
+            # Log the exception so we can diagnose why JPEG generation failed (missing Pillow, etc.)
             logging.getLogger(__name__).exception("Failed to render JPEG preview: %s", exc)
             jpeg_bytes = None
 
@@ -184,13 +163,45 @@ class GridBuilder:
             y_coords=y_grid,
             bbox_3857=bbox_3857,
             bbox_wgs84=bbox_wgs84,
-            metadata_json=json.dumps(metadata),
             levels=levels,
             thresholds=thresholds,
             intensity_classes=copy.deepcopy(INTENSITY_CLASSES),
             jpeg_bytes=jpeg_bytes,
+            timestamp=timestamp,
+            metadata=metadata,
         )
 
+    @staticmethod
+    def _render_preview(grid: np.ndarray, levels: np.ndarray, vmin: float, vmax: float) -> bytes:
+        """Rasterize the grid to a viridis JPEG with white lines at ``levels``.
+
+        Pixels are coloured straight from the cell values (no matplotlib
+        figure), scaled up by whole cells to about PREVIEW_MAX_PX on the long side.
+        """
+        if np.isnan(vmin):
+            vmin, vmax = 0.0, 1.0
+
+        # Row 0 of the grid is its southern edge; image rows run north to south
+        image = grid[::-1]
+        scale = max(1, PREVIEW_MAX_PX // max(image.shape))
+        if scale > 1:
+            image = np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+
+        rgb = np.ascontiguousarray(
+            colormaps["viridis"](colors.Normalize(vmin=vmin, vmax=vmax)(image), bytes=True)[..., :3]
+        )
+
+        # Contour lines: pixels whose level band differs from the next pixel down or right
+        bands = np.digitize(image, levels)
+        edges = np.zeros(bands.shape, dtype=bool)
+        edges[:-1] |= bands[:-1] != bands[1:]
+        edges[:, :-1] |= bands[:, :-1] != bands[:, 1:]
+        rgb[edges] = 255
+
+        buf = BytesIO()
+        Image.fromarray(rgb).save(buf, format="JPEG", quality=70, optimize=True)
+        return buf.getvalue()
+
     @staticmethod
     def _lanczos_kernel(radius: int, a: int = 4) -> np.ndarray:
         x = np.arange(-radius, radius + 1, dtype=float)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import logging
-from datetime import timezone
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import Optional
 
-import numpy as np
+import orjson
 
 from .config import load
 from .contours import generate_contours_geojson
@@ -20,9 +23,10 @@ logger = logging.getLogger("etl")
 def run():
     cfg = load()
     logger.info(
-        "starting grid ETL (interval=%s, res=%sm, dry_run=%s)",
+        "starting grid ETL (interval=%s, res=%sm, workers=%d, dry_run=%s)",
         cfg.grid_interval,
         cfg.grid_resolution_m,
+        cfg.workers,
         cfg.dry_run,
     )
 
@@ -36,39 +40,141 @@ def run():
         logger.info("no pending grid runs")
         return
 
-    for run_id, slot in pending:
-        logger.info("processing slot %s (id=%s)", slot.isoformat(), run_id)
-        try:
-            snapshot = db.load_snapshot(slot)
-            if snapshot.empty:
-                raise ValueError("no clean measurements for slot")
+    run_ids, slots = zip(*pending)
+    snapshots = db.load_snapshots(list(slots))
+    workers = min(cfg.workers, len(pending))
+    latest = _LatestPointer(uploader)
+    previews = _PreviewCache()
+    if workers > 1:
+        # Slots are independent: overlap one slot's DB writes and uploads with
+        # another's grid build (NumPy/SciPy/PROJ release the GIL)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(
+                pool.map(
+                    _process_slot,
+                    run_ids,
+                    slots,
+                    (snapshots[slot] for slot in slots),
+                    repeat(cfg),
+                    repeat(db),
+                    repeat(builder),
+                    repeat(uploader),
+                    repeat(latest),
+                    repeat(previews),
+                )
+            )
+    else:
+        for run_id, slot in pending:
+            _process_slot(run_id, slot, snapshots[slot], cfg, db, builder, uploader, latest, previews)
 
-            artifact = builder.build(snapshot)
 
-            timestamp = slot.strftime("%Y%m%dT%H%M%SZ")
-            base_key = f"grids/{timestamp}"
+class _LatestPointer:
+    """Publishes grids/latest.json, never moving it back to an older slot within a run."""
+
+    def __init__(self, uploader: BlobUploader):
+        self._uploader = uploader
+        self._lock = threading.Lock()
+        self._slot = None
+
+    def publish(self, slot, payload: dict) -> Optional[str]:
+        with self._lock:
+            if self._slot is not None and slot <= self._slot:
+                return None
+            url = self._uploader.upload_json("grids/latest.json", payload)
+            self._slot = slot
+            return url
+
+
+class _PreviewCache:
+    """URLs of the JPEG previews uploaded in this run, keyed by content hash.
+
+    Dry slots render byte-identical previews; the pointer can share one blob.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._urls = {}
+
+    @staticmethod
+    def _digest(jpeg_bytes: bytes) -> bytes:
+        return hashlib.blake2b(jpeg_bytes, digest_size=16).digest()
+
+    def get(self, jpeg_bytes: bytes) -> Optional[str]:
+        with self._lock:
+            return self._urls.get(self._digest(jpeg_bytes))
+
+    def put(self, jpeg_bytes: bytes, url: str) -> None:
+        with self._lock:
+            self._urls[self._digest(jpeg_bytes)] = url
 
-            if cfg.dry_run:
-                logger.info(
-                    "dry-run: would upload artifacts for slot %s (grid shape %s)",
-                    slot,
-                    artifact.data_grid.shape,
-                )
-                db.mark_success(
-                    run_id,
-                    json.dumps(list(artifact.bbox_3857)),
-                    json_url="",
-                    contours_url="",
-                    message="dry-run",
-                )
-                continue
 
-            # Upload grid JSON
-            grid_json_url = uploader.upload_grid_json(
+def _process_slot(
+    run_id, slot, snapshot, cfg, db, builder, uploader, latest: _LatestPointer, previews: _PreviewCache
+) -> None:
+    slot_iso = slot.isoformat()
+    logger.info("processing slot %s (id=%s)", slot_iso, run_id)
+    try:
+        if snapshot.empty:
+            raise ValueError("no clean measurements for slot")
+
+        artifact = builder.build(snapshot)
+
+        timestamp = slot.strftime("%Y%m%dT%H%M%SZ")
+        base_key = f"grids/{timestamp}"
+
+        if cfg.dry_run:
+            logger.info(
+                "dry-run: would upload artifacts for slot %s (grid shape %s)",
+                slot,
+                artifact.data_grid.shape,
+            )
+            db.mark_success(
+                run_id,
+                orjson.dumps(artifact.bbox_3857).decode(),
+                json_url="",
+                contours_url="",
+                message="dry-run",
+            )
+            return
+
+        # The slot's artifacts are independent blobs: upload them concurrently
+        # with the aggregates insert, encoding the contours while they are in flight
+        with ThreadPoolExecutor(max_workers=4) as uploads:
+            grid_json_upload = uploads.submit(
+                uploader.upload_grid_json,
                 f"{base_key}/grid.json.gz",
                 artifact,
             )
 
+            # Upload JPEG preview if available (and not already uploaded this run)
+            jpeg_upload = None
+            jpeg_url = None
+            if getattr(artifact, 'jpeg_bytes', None):
+                jpeg_url = previews.get(artifact.jpeg_bytes)
+                if jpeg_url is not None:
+                    logger.info("reusing identical JPEG preview: %s", jpeg_url)
+                else:
+                    jpeg_upload = uploads.submit(
+                        uploader.upload_bytes,
+                        f"{base_key}/preview.jpg",
+                        artifact.jpeg_bytes,
+                        "image/jpeg",
+                    )
+
+            # Calculate sensor aggregates and insert them into the database
+            slot_end = slot + cfg.grid_interval
+            aggregates = calculate_grid_sensor_aggregates(
+                snapshot,
+                ts_start=slot,
+                ts_end=slot_end,
+                grid_run_id=run_id,
+            )
+            aggregates_insert = None
+            if aggregates:
+                aggregates_insert = uploads.submit(db.insert_sensor_aggregates, aggregates)
+            else:
+                logger.warning("no aggregates calculated for slot %s", slot_iso)
+
             # Upload contours GeoJSON
             contour_bytes = generate_contours_geojson(
                 artifact.x_coords,
@@ -76,70 +182,55 @@ def run():
                 artifact.data_grid,
                 artifact.thresholds,
             )
-            contours_url = uploader.upload_bytes(
+            contours_upload = uploads.submit(
+                uploader.upload_bytes,
                 f"{base_key}/contours.geojson",
                 contour_bytes,
                 "application/geo+json",
             )
 
-            # Upload JPEG preview if available
-            jpeg_url = None
-            if getattr(artifact, 'jpeg_bytes', None):
+            grid_json_url = grid_json_upload.result()
+            contours_url = contours_upload.result()
+
+            if jpeg_upload is not None:
                 try:
-                    jpeg_url = uploader.upload_bytes(
-                        f"{base_key}/preview.jpg", 
-                        artifact.jpeg_bytes, 
-                        "image/jpeg"
-                    )
+                    jpeg_url = jpeg_upload.result()
+                    previews.put(artifact.jpeg_bytes, jpeg_url)
                     logger.info("uploaded JPEG preview: %s", jpeg_url)
                 except Exception as exc:
                     logger.warning("failed to upload JPEG: %s", exc)
                     jpeg_url = None
 
-            # Calculate sensor aggregates
-            slot_end = slot + cfg.grid_interval
-            aggregates = calculate_grid_sensor_aggregates(
-                snapshot,
-                ts_start=slot,
-                ts_end=slot_end
-            )
-            
-            # Insert aggregates into database
-            if aggregates:
-                for agg in aggregates:
-                    agg['grid_run_id'] = run_id
-                inserted_count = db.insert_sensor_aggregates(aggregates)
-                logger.info("inserted %d sensor aggregates", inserted_count)
-            else:
-                logger.warning("no aggregates calculated for slot %s", slot.isoformat())
-
-            # Update latest pointer (no .npz reference)
-            metadata = json.loads(artifact.metadata_json)
-            latest_payload = {
-                "timestamp": metadata["timestamp"],
-                "grid_json_url": grid_json_url,
-                "grid_preview_jpeg_url": jpeg_url,
-                "contours_url": contours_url,
-                "res_m": cfg.grid_resolution_m,
-                "bbox": metadata["bbox_wgs84"],
-                "intensity_classes": metadata.get("intensity_classes", []),
-                "intensity_thresholds": metadata.get("intensity_thresholds", []),
-            }
-            latest_url = uploader.upload_json("grids/latest.json", latest_payload)
+            if aggregates_insert is not None:
+                logger.info("inserted %d sensor aggregates", aggregates_insert.result())
+
+        # Update latest pointer (no .npz reference), straight from the artifact fields
+        latest_payload = {
+            "timestamp": artifact.timestamp,
+            "grid_json_url": grid_json_url,
+            "grid_preview_jpeg_url": jpeg_url,
+            "contours_url": contours_url,
+            "res_m": cfg.grid_resolution_m,
+            "bbox": artifact.bbox_wgs84,
+            "intensity_classes": artifact.intensity_classes,
+            "intensity_thresholds": artifact.thresholds,
+        }
+        latest_url = latest.publish(slot, latest_payload)
+        if latest_url:
             logger.info("updated latest pointer: %s", latest_url)
 
-            # Mark grid run as successful
-            db.mark_success(
-                run_id,
-                json.dumps(list(artifact.bbox_3857)),
-                json_url=grid_json_url,
-                contours_url=contours_url,
-            )
-
-            logger.info("slot %s processed: %s", slot.isoformat(), base_key)
-        except Exception as exc:  # pragma: no cover
-            logger.exception("slot %s failed", slot)
-            db.mark_failure(run_id, str(exc))
+        # Mark grid run as successful
+        db.mark_success(
+            run_id,
+            orjson.dumps(artifact.bbox_3857).decode(),
+            json_url=grid_json_url,
+            contours_url=contours_url,
+        )
+
+        logger.info("slot %s processed: %s", slot_iso, base_key)
+    except Exception as exc:  # pragma: no cover
+        logger.exception("slot %s failed", slot_iso)
+        db.mark_failure(run_id, str(exc))
 
 
 def main():
@@ -1,22 +1,32 @@
 from __future__ import annotations
 
+import base64
 import gzip
-import json
+import logging
 from io import BytesIO
 
 import numpy as np
-import vercel_blob
+import orjson
 
+from ..blob import BlobClient, upload_retry
 from .config import Config
 
+logger = logging.getLogger("etl.uploader")
+
+# Transient failures (network errors, timeouts, 429/5xx raised as HTTPError)
+# are retried so one blip does not fail the slot and force a rebuild
+_upload_retry = upload_retry(logger, attempts=3, max_wait_s=10)
+
+
+def _axis_step(axis: np.ndarray) -> float:
+    """Spacing of an evenly spaced grid axis (np.linspace over the bbox)."""
+    return float(axis[-1] - axis[0]) / (len(axis) - 1) if len(axis) > 1 else 0.0
+
 
 class BlobUploader:
     def __init__(self, cfg: Config):
         self.cfg = cfg
-        # vercel_blob expects the token via environment variable
-        import os
-
-        os.environ["BLOB_READ_WRITE_TOKEN"] = cfg.blob_token
+        self._blob = BlobClient(cfg.blob_token, cfg.blob_timeout_s)
 
     def _resolve_url(self, info: dict, fallback_key: str) -> str:
         url = info.get("url") or info.get("downloadUrl")
@@ -25,12 +35,12 @@ class BlobUploader:
         pathname = info.get("pathname") or fallback_key
         return f"{self.cfg.blob_base_url}/{pathname.lstrip('/')}"
 
+    @_upload_retry
     def upload_bytes(self, key: str, data: bytes, content_type: str) -> str:
-        info = vercel_blob.put(key, data, {"contentType": content_type, "allowOverwrite": True})
-        return self._resolve_url(info, key)
+        return self._resolve_url(self._blob.put(key, data, content_type), key)
 
     def upload_json(self, key: str, payload: dict) -> str:
-        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        data = orjson.dumps(payload)
         return self.upload_bytes(key, data, "application/json")
 
     def upload_npz(self, key: str, numpy_payload: dict) -> str:
@@ -40,9 +50,7 @@ class BlobUploader:
         return self.upload_bytes(key, buffer.getvalue(), "application/octet-stream")
 
     def upload_grid_json(self, key: str, grid_artifacts) -> str:
-        import numpy as np
-
-        metadata = json.loads(grid_artifacts.metadata_json)
+        metadata = grid_artifacts.metadata
         payload = {
             "timestamp": metadata["timestamp"],
             "res_m": metadata["res_m"],
@@ -50,9 +58,16 @@ class BlobUploader:
             "bbox_wgs84": metadata["bbox_wgs84"],
             "intensity_classes": metadata.get("intensity_classes", []),
             "intensity_thresholds": metadata.get("intensity_thresholds", []),
-            "x": grid_artifacts.x_coords.tolist(),
-            "y": grid_artifacts.y_coords.tolist(),
-            "data": grid_artifacts.data_grid.astype(np.float32).tolist(),
+            # The axes are evenly spaced: origin + step (lengths are in shape)
+            "x_origin": float(grid_artifacts.x_coords[0]),
+            "x_step": _axis_step(grid_artifacts.x_coords),
+            "y_origin": float(grid_artifacts.y_coords[0]),
+            "y_step": _axis_step(grid_artifacts.y_coords),
+            # Row-major little-endian float32 buffer instead of nested lists
+            "shape": list(grid_artifacts.data_grid.shape),
+            "data_b64": base64.b64encode(
+                np.ascontiguousarray(grid_artifacts.data_grid, dtype="<f4")
+            ).decode("ascii"),
         }
-        data = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        data = gzip.compress(orjson.dumps(payload))
         return self.upload_bytes(key, data, "application/json+gzip")